@@ -1,4 +1,6 @@
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import matplotlib.pyplot as plt
 from PyQt5.QtWidgets import QMainWindow, QApplication, QSplitter, QLabel,\
@@ -12,7 +14,7 @@ from matplotlib.backends.backend_qt5agg import (
         FigureCanvas, NavigationToolbar2QT as NavigationToolbar)
 from matplotlib.figure import Figure
 
-from UGParameterEstimator import Result
+from UGParameterEstimator import Result, Evaluation
 
 class AnalysisTool(QApplication):
     def __init__(self, sys_argv):
@@ -52,24 +54,45 @@ class AnalysisTool(QApplication):
         self.main_window.setStatusBar(status_bar)
 
         self.result = None
+        self.targetdata = None
+
+        # computes the residual norms of large iterations in parallel
+        self.executor = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+        # names of the fields currently set in the canvas
+        self.fieldnames = None
+
+        # residual norms of the evaluations, keyed by (file, modification time, index, position in the index),
+        # so they stay valid when an unchanged file is opened again
+        self.normcache = {}
+        self.resultkey = None
         self.index = 0
-        self.plotdata = [[], [], []]
-        self.currentData = [[], [], []]
+
+        # points of all previous iterations, stored in a buffer growing by doubling its capacity.
+        # only the first plotcount columns are valid
+        self.plotcount = 0
+        self.plotdata = np.empty((3, 1024), dtype=np.float64)
+        self.currentData = np.empty((3, 0), dtype=np.float64)
 
         self.installEventFilter(self)
 
     def openFile(self):
         resultfilename = QFileDialog.getOpenFileName(self.main_window, "Select result file", filter="Result files (*.pkl)")[0]
-        self.result = Result.load(resultfilename)
+        result = Result.load(resultfilename)
+
+        self.result = result
+        self.resultkey = (resultfilename, os.path.getmtime(resultfilename))
+
+        # the target is fixed for the whole result file, so convert it only once
+        self.targetdata = np.ascontiguousarray(self.result.metadata["target"].getNumpyArray(), dtype=np.float64)
         self.status_openfile.setText(resultfilename)
         self.status_data.setText("Iterations: " + str(self.result.iterationCount))
         
-        fields = []
-        for p in self.result.metadata["parametermanager"].parameters:
-            fields.append((p.name, {}))
-
-        fields.append(("norm", {}))
-        self.canvas.setFields(fields)
+        # reconfiguring the canvas is expensive, so only do it if the parameters changed
+        fieldnames = tuple(p.name for p in self.result.metadata["parametermanager"].parameters) + ("norm",)
+        if fieldnames != self.fieldnames:
+            self.canvas.setFields([(name, {}) for name in fieldnames])
+            self.fieldnames = fieldnames
 
         self.index = 0
         self.plotNext()
@@ -84,6 +107,19 @@ class AnalysisTool(QApplication):
         return False
 
 
+    def appendPlotData(self, newdata):
+        count = newdata.shape[1]
+        if self.plotcount + count > self.plotdata.shape[1]:
+            capacity = self.plotdata.shape[1]
+            while self.plotcount + count > capacity:
+                capacity *= 2
+            grown = np.empty((3, capacity), dtype=np.float64)
+            grown[:, :self.plotcount] = self.plotdata[:, :self.plotcount]
+            self.plotdata = grown
+
+        self.plotdata[:, self.plotcount:self.plotcount + count] = newdata
+        self.plotcount += count
+
     def plotNext(self):
         if self.result is None:
             return
@@ -94,30 +130,31 @@ class AnalysisTool(QApplication):
         data, tag, _ = self.result.evaluations[self.index]
 
         target = self.result.metadata["target"]
-        targetdata = target.getNumpyArray()
-
-        parameterdata = []
-
-        self.plotdata[0].extend(self.currentData[0])
-        self.plotdata[1].extend(self.currentData[1])
-        self.plotdata[2].extend(self.currentData[2])
-
-        self.currentData = [[],[],[]]
-
-        for ev in data:
-            parameterdata.append(ev.parameters)
-
-            measurement = ev.getNumpyArrayLike(target)
-            residual = measurement - targetdata
-
-            self.currentData[2].append(np.linalg.norm(residual))
-
-        parameterdata = list(map(list, zip(*parameterdata)))
-        
-        self.currentData[0] = parameterdata[0]
-        self.currentData[1] = parameterdata[1]
-
-        self.canvas.plot(self.plotdata, self.currentData)
+        targetdata = self.targetdata
+
+        self.appendPlotData(self.currentData)
+
+        parameterdata = np.empty((len(data), len(self.result.metadata["parametermanager"].parameters)),
+                                 dtype=np.float64)
+        for i, ev in enumerate(data):
+            parameterdata[i] = ev.parameters
+
+        # compute the residual norms of all evaluations not seen before in one go
+        keys = [self.resultkey + (self.index, i) for i in range(len(data))]
+        missing = [i for i, key in enumerate(keys) if key not in self.normcache]
+        if missing:
+            # for few evaluations, dispatching to the threads costs more than it saves
+            executor = self.executor if len(missing) > 64 else None
+            norms = Evaluation.residualNorms([data[i] for i in missing], target, targetdata, executor)
+            for i, norm in zip(missing, norms):
+                self.normcache[keys[i]] = norm
+
+        self.currentData = np.empty((3, len(data)), dtype=np.float64)
+        self.currentData[0] = parameterdata[:, 0]
+        self.currentData[1] = parameterdata[:, 1]
+        self.currentData[2] = [self.normcache[key] for key in keys]
+
+        self.canvas.plot(self.plotdata[:, :self.plotcount], self.currentData)
         self.index += 1
 
 
@@ -0,0 +1,69 @@
+import unittest
+import os
+import sys
+import tempfile
+from UGParameterEstimator import ParameterManager, DirectParameter, GenericEvaluation, LocalEvaluator, \
+    UG4ParameterOutputAdapter, KeyValueFileParameterOutputAdapter
+import numpy as np
+
+sys.path.insert(0, os.path.abspath('../..'))
+
+class EvaluatorCacheDirectoryTests(unittest.TestCase):
+    """
+    A test class for validating the cache directory of the Evaluator class.
+
+    Evaluations are stored in a temporary cache directory by one evaluator and
+    loaded from there by fresh evaluators, which only find them if they would
+    produce the same results.
+    """
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.luafile = os.path.join(self.tempdir.name, "script.lua")
+        with open(self.luafile, "w") as f:
+            f.write("-- empty script")
+        self.cachedirectory = os.path.join(self.tempdir.name, "cache")
+
+        self.parametermanager = ParameterManager()
+        self.parametermanager.addParameter(DirectParameter("a", 1.0))
+        self.parameters = np.array([1.5])
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def createEvaluator(self, parameter_output_adapter=None, cliparameters=[]):
+        if parameter_output_adapter is None:
+            parameter_output_adapter = UG4ParameterOutputAdapter()
+        evaluator = LocalEvaluator(self.luafile, os.path.join(self.tempdir.name, "exchange"), self.parametermanager,
+                                   GenericEvaluation, parameter_output_adapter, cliparameters=cliparameters)
+        evaluator.reset()
+        evaluator.setCacheDirectory(self.cachedirectory)
+        return evaluator
+
+    def storeEvaluation(self):
+        evaluation = GenericEvaluation([1, 2, 3], [0.1, 0.2, 0.3], 0, self.parameters)
+        self.createEvaluator().handleNewEvaluations([evaluation], "test")
+        return evaluation
+
+    def test_store_and_load(self):
+        stored = self.storeEvaluation()
+        self.assertEqual(len(os.listdir(self.cachedirectory)), 1)
+
+        loaded = self.createEvaluator().checkCache(self.parameters.copy())
+        self.assertIsNotNone(loaded)
+        self.assertIsNot(loaded, stored)
+        np.testing.assert_array_equal(loaded.data, stored.data)
+        np.testing.assert_array_equal(loaded.times, stored.times)
+
+        self.assertIsNone(self.createEvaluator().checkCache(np.array([2.5])))
+
+    def test_different_cliparameters(self):
+        self.storeEvaluation()
+        self.assertIsNone(self.createEvaluator(cliparameters=["-dim", "3"]).checkCache(self.parameters))
+
+    def test_different_output_adapter(self):
+        self.storeEvaluation()
+        evaluator = self.createEvaluator(parameter_output_adapter=KeyValueFileParameterOutputAdapter())
+        self.assertIsNone(evaluator.checkCache(self.parameters))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -38,11 +38,11 @@ class FreeSurfaceTimeDependentEvaluationTests(unittest.TestCase):
 
     def test_read_in(self):
         self.assertEqual(self.series0.locations, [0, 2])
-        self.assertEqual(self.series0.times, [1, 2, 3])
-        self.assertEqual(self.series0.data, [[1, 2], [2, 3], [3, 4]])
+        np.testing.assert_array_equal(self.series0.times, np.array([1, 2, 3], dtype=np.float64))
+        np.testing.assert_array_equal(self.series0.data, np.array([[1, 2], [2, 3], [3, 4]], dtype=np.float64))
         self.assertEqual(self.series1.locations, [0, 2])
-        self.assertEqual(self.series1.times, [1, 1.5, 2.5, 3.5])
-        self.assertEqual(self.series1.data, [[1, 2], [2, 3], [3, 4], [4, 5]])
+        np.testing.assert_array_equal(self.series1.times, np.array([1, 1.5, 2.5, 3.5], dtype=np.float64))
+        np.testing.assert_array_equal(self.series1.data, np.array([[1, 2], [2, 3], [3, 4], [4, 5]], dtype=np.float64))
 
     def test_numpy_array(self):
         self.assertTrue(np.allclose(
@@ -0,0 +1,92 @@
+import unittest
+import os
+import sys
+import tempfile
+import warnings
+from UGParameterEstimator import ParameterManager, DirectParameter, GenericEvaluation, Evaluator, \
+    GaussNewtonOptimizer, LinearParallelLineSearch, Result
+import numpy as np
+
+sys.path.insert(0, os.path.abspath('../..'))
+
+class ExponentialEvaluator(Evaluator):
+    """
+    Evaluates the model a*exp(-b*t) directly, instead of calling UG4.
+    """
+    parallelism = 1
+    fixedparameters = {}
+    weight = []
+
+    def __init__(self, times):
+        self.times = times
+        self.parametermanager = ParameterManager()
+        self.parametermanager.addParameter(DirectParameter("a", 1.0))
+        self.parametermanager.addParameter(DirectParameter("b", 1.0))
+        self.reset()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *args):
+        pass
+
+    def evaluate(self, evaluationlist, transform=True, tag="", check_cache=True):
+        results = []
+        for parameters, checkcache in zip(evaluationlist, self.getCacheChecks(check_cache, len(evaluationlist))):
+            parameters = np.asarray(parameters, dtype=np.float64)
+            evaluation = self.checkCache(parameters) if checkcache else None
+            if evaluation is None:
+                evaluation = GenericEvaluation(parameters[0] * np.exp(-parameters[1] * self.times), self.times,
+                                               0, parameters)
+            results.append(evaluation)
+        self.handleNewEvaluations(results, tag)
+        return results
+
+class GaussNewtonOptimizerDampingTests(unittest.TestCase):
+    """
+    A test class for validating the damped steps of the GaussNewtonOptimizer class.
+
+    The model a*exp(-b*t) is fitted to data generated with a=2, b=0.7.
+    """
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.times = np.linspace(0, 5, 40)
+        self.target = GenericEvaluation(2.0 * np.exp(-0.7 * self.times), self.times)
+        self.evaluator = ExponentialEvaluator(self.times)
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def createOptimizer(self):
+        return GaussNewtonOptimizer(LinearParallelLineSearch(self.evaluator), damping=1.0)
+
+    def createResult(self):
+        return Result(os.path.join(self.tempdir.name, "result.pkl"))
+
+    def test_damped_steps_reduce_residual(self):
+        result = self.createOptimizer().run(self.evaluator, np.array([1.0, 1.0]), self.target, self.createResult())
+
+        norms = [iteration["residualnorm"] for iteration in result.iterations]
+        self.assertGreater(len(norms), 1)
+        self.assertTrue(all(b < a for a, b in zip(norms, norms[1:])))
+        self.assertLess(norms[-1], 1e-4 * norms[0])
+        np.testing.assert_allclose(result.iterations[-1]["parameters"], [2.0, 0.7], rtol=1e-2)
+
+    def test_damped_step_at_optimum(self):
+        optimizer = self.createOptimizer()
+        guess = np.array([2.0, 0.7])
+        V, evaluation = optimizer.getJacobiMatrix(guess, self.evaluator, self.target, self.createResult())
+        r = evaluation.getNumpyArrayLike(self.target) - self.target.getNumpyArray()
+        count = self.evaluator.total_evaluation_count
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            nextguess, _, converged = optimizer.doDampedStep(self.evaluator, guess, self.target, V, r,
+                                                             0.5 * r.dot(r), 1.0, None, self.createResult())
+
+        self.assertIsNone(nextguess)
+        self.assertTrue(converged)
+        self.assertEqual(self.evaluator.total_evaluation_count, count)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,9 @@
 import unittest
 import os
 import sys
-from UGParameterEstimator import ErroredEvaluation, GenericEvaluation
+import tempfile
+from unittest import mock
+from UGParameterEstimator import Evaluation, ErroredEvaluation, GenericEvaluation
 import numpy as np
 
 sys.path.insert(0, os.path.abspath('../..'))
@@ -142,18 +144,18 @@ class GenericEvaluationTests(unittest.TestCase):
         self.assertFalse(isinstance(self.series0, ErroredEvaluation))
         self.assertFalse(isinstance(self.series1, ErroredEvaluation))
 
-        self.assertEqual(self.series0.times, [1, 2, 3, 4, 5])
-        self.assertEqual(self.series1.times, [1.5, 2.5, 3.5, 4])
-        self.assertEqual(self.series0.data, [1, 2, 2, 1, 0])
-        self.assertEqual(self.series1.data, [1.5, 2.5, 1.5, 1])
+        np.testing.assert_array_equal(self.series0.times, np.array([1, 2, 3, 4, 5], dtype=np.float64))
+        np.testing.assert_array_equal(self.series1.times, np.array([1.5, 2.5, 3.5, 4], dtype=np.float64))
+        np.testing.assert_array_equal(self.series0.data, np.array([1, 2, 2, 1, 0], dtype=np.float64))
+        np.testing.assert_array_equal(self.series1.data, np.array([1.5, 2.5, 1.5, 1], dtype=np.float64))
 
     def test_parse_csv(self):
         self.series2 = GenericEvaluation.parse(".", 2)
         if isinstance(self.series2, ErroredEvaluation):
             print(self.series2.reason)
         self.assertFalse(isinstance(self.series2, ErroredEvaluation))
-        self.assertEqual(self.series2.times, [0.5, 1, 2])
-        self.assertEqual(self.series2.data, [3, 2.4, 4.623])
+        np.testing.assert_array_equal(self.series2.times, np.array([0.5, 1, 2], dtype=np.float64))
+        np.testing.assert_array_equal(self.series2.data, np.array([3, 2.4, 4.623], dtype=np.float64))
 
     def test_error_on_not_finished(self):
         self.series3 = GenericEvaluation.parse(".", 3)
@@ -186,5 +188,67 @@ class GenericEvaluationTests(unittest.TestCase):
             self.series1.getNumpyArrayLike(self.series1),
             np.array([1.5, 2.5, 1.5, 1])))
 
+    def test_residual_norms(self):
+        self.assertTrue(np.allclose(
+            Evaluation.residualNorms([self.series0, self.series1], self.series1),
+            np.array([0.5, 0])))
+
+class GenericEvaluationCSVTests(unittest.TestCase):
+    """
+    A test class comparing the fast path for csv files (loadCSVColumns) with the row by row parsing.
+
+    Every file is parsed by fromCSV twice, once with the fast path disabled. Both have to
+    agree, files the fast path can not handle exactly have to be left to the row by row parsing.
+    """
+    files = {
+        "plain": "step,time,value\n1,0.5,3\n2,1,2.4\n3,2,4.623\nFINISHED,,\n",
+        "repeated_header": "step,time,value\n1,0.5,3\nstep,time,value\n2,1,2.4\nFINISHED,,\n",
+        "comment_lines": "step,time,value\n# comment\n1,0.5,3\n#2,1,2.4\n3,2,4.623\nFINISHED,,",
+        "crlf": "step,time,value\r\n1,0.5,3\r\n2,1,2.4\r\nFINISHED,,\r\n",
+        "no_rows": "step,time,value\nFINISHED,,\n",
+        "comment_in_row": "step,time,value\n1,0.5,3\n2,1,2.4#comment\n3,2,4.623\nFINISHED,,\n",
+        "early_finished": "step,time,value\n1,0.5,3\nFINISHED,,\n2,1,2.4\nFINISHED,,\n",
+        "finished_suffix": "step,time,value\n1,0.5,3\nFINISHEDX,,\n",
+        "finished_spaces": "step,time,value\n1,0.5,3\nFINISHED  \n",
+        "commented_repeated_header": "step,time,value\n1,0.5,3\n# step,time,value\n2,1,2.4\nFINISHED,,\n",
+        "header_in_row": "time,value\n1,0.5\ntime,value,2\n2,1\nFINISHED,,\n",
+        "non_numeric_row": "step,time,value\n1,0.5,3\n2,abc,2.4\nFINISHED,,\n",
+        "short_row": "step,time,value\n1,0.5,3\n2,1\nFINISHED,,\n",
+        "not_finished": "step,time,value\n1,0.5,3\n2,1,2.4\n",
+    }
+
+    # files the fast path has to handle itself
+    fastfiles = ["plain", "repeated_header", "comment_lines", "crlf", "no_rows"]
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def writeFile(self, name):
+        filename = os.path.join(self.tempdir.name, name + "_measurement.csv")
+        with open(filename, "w", newline="") as f:
+            f.write(self.files[name])
+        return filename
+
+    def test_fast_path_used(self):
+        for name in self.fastfiles:
+            with self.subTest(name):
+                self.assertIsNotNone(GenericEvaluation.loadCSVColumns(self.writeFile(name)))
+
+    def test_fast_path_same_as_row_by_row(self):
+        for name in self.files:
+            with self.subTest(name):
+                filename = self.writeFile(name)
+                fast = GenericEvaluation.fromCSV(filename)
+                with mock.patch.object(GenericEvaluation, "loadCSVColumns", return_value=None):
+                    rowbyrow = GenericEvaluation.fromCSV(filename)
+
+                self.assertEqual(isinstance(fast, ErroredEvaluation), isinstance(rowbyrow, ErroredEvaluation))
+                if not isinstance(rowbyrow, ErroredEvaluation):
+                    np.testing.assert_array_equal(fast.times, rowbyrow.times)
+                    np.testing.assert_array_equal(fast.data, rowbyrow.data)
+
 if __name__ == '__main__':
     unittest.main()
@@ -11,5 +11,6 @@ setup(
     install_requires=["numpy", "scipy", "scikit-optimize"],
     extras_require={
         "analysisTool": ["numpy", "scipy", "scikit-optimize", "matplotlib", "PyQt5", "pyqtgraph"],
+        "speedups": ["numba", "orjson", "ijson"],
     },
 )
@@ -1,4 +1,6 @@
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 
 class Evaluation(ABC):
     """Base class for all Evaluation classes.
@@ -11,6 +13,32 @@ class Evaluation(ABC):
     eval_id = None
     runtime = None
 
+    @staticmethod
+    def parameterKey(parameters):
+        """Returns a hashable key for the given parameters. Parameters considered equal by
+        np.array_equal (apart from nan) have the same key.
+
+        :param parameters: parameters to get the key of
+        :type parameters: numpy array
+        :return: key of the parameters
+        :rtype: tuple
+        """
+        # adding 0.0 turns -0.0 into 0.0
+        parameters = np.asarray(parameters, dtype=np.float64) + 0.0
+        return parameters.shape, parameters.tobytes()
+
+    @property
+    def parametersKey(self):
+        """Returns the key of the parameters of this evaluation, see parameterKey.
+        It is computed on every call, so it is also correct for parameters changed in place.
+
+        :return: key of the parameters, or None if there are no parameters
+        :rtype: tuple
+        """
+        if self.parameters is None:
+            return None
+        return Evaluation.parameterKey(self.parameters)
+
     @abstractmethod
     def getNumpyArray(self):
         """Returns stored measurements as a 1d numpy array
@@ -53,6 +81,83 @@ class Evaluation(ABC):
         """
         pass
 
+    def squaredResidualTo(self, target, targetdata=None):
+        """Computes the squared euclidean norm of the residual of this evaluation to the target.
+        Subclasses may override this to avoid building the interpolated measurement.
+
+        :param target: target evaluation, this evaluation is interpolated to its format
+        :type target: Evaluation
+        :param targetdata: target.getNumpyArray(), if already available
+        :type targetdata: numpy array, optional
+        :raises IncompatibleFormatError: When the two Evaluations can not be interpolated between
+        :return: squared norm of the residual
+        :rtype: float
+        """
+        if targetdata is None:
+            targetdata = target.getNumpyArray()
+
+        residual = self.getNumpyArrayLike(target) - targetdata
+        return float(residual.dot(residual))
+
+    @staticmethod
+    def getNumpyArraysLike(evaluations, target, threads=1):
+        """Converts multiple evaluations to numpy arrays in the format of the target, using getNumpyArrayLike.
+        None-values or ErroredEvaluations are converted to None.
+
+        :param evaluations: the evaluations to convert
+        :type evaluations: list of Evaluation
+        :param target: Evaluation describing the format/time steps each evaluation should be converted/interpolated to
+        :type target: Evaluation
+        :param threads: number of threads converting the evaluations, defaults to 1. More only pay off for large
+            evaluations whose interpolation releases the GIL (the numba kernel of GenericEvaluation does).
+        :type threads: int, optional
+        :raises IncompatibleFormatError: When an evaluation can not be interpolated to the target
+        :return: the results of the conversions
+        :rtype: list of numpy arrays
+        """
+        def convert(evaluation):
+            if evaluation is None or isinstance(evaluation, ErroredEvaluation):
+                return None
+            return evaluation.getNumpyArrayLike(target)
+
+        threads = min(len(evaluations), threads)
+        if threads <= 1:
+            return [convert(evaluation) for evaluation in evaluations]
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            return list(executor.map(convert, evaluations))
+
+    @staticmethod
+    def residualNorms(evaluations, target, targetdata=None, executor=None):
+        """Computes the euclidean norms of the residuals of multiple evaluations to the target.
+
+        :param evaluations: evaluations to compute the residual norms of
+        :type evaluations: list of Evaluation
+        :param target: target evaluation, the evaluations are interpolated to its format
+        :type target: Evaluation
+        :param targetdata: target.getNumpyArray(), if already available
+        :type targetdata: numpy array, optional
+        :param executor: if given, the evaluations are handled in parallel using this executor.
+            Threads only pay off for large evaluations whose interpolation releases the GIL.
+        :type executor: concurrent.futures.Executor, optional
+        :raises IncompatibleFormatError: When an evaluation can not be interpolated to the target
+        :return: residual norm of every evaluation, NaN for ErroredEvaluations
+        :rtype: numpy array
+        """
+        if targetdata is None:
+            targetdata = target.getNumpyArray()
+
+        def squaredResidual(evaluation):
+            if isinstance(evaluation, ErroredEvaluation):
+                return np.nan
+            return evaluation.squaredResidualTo(target, targetdata)
+
+        if executor is None:
+            squarednorms = [squaredResidual(evaluation) for evaluation in evaluations]
+        else:
+            squarednorms = list(executor.map(squaredResidual, evaluations))
+
+        return np.sqrt(np.array(squarednorms, dtype=np.float64))
+
     class IncompatibleFormatError(Exception):
         pass
 
@@ -12,17 +12,17 @@ class FreeSurfaceEvaluation(Evaluation):
     """Base class for all Evaluation classes containing measurements of free surface positions.
     """
 
-    # 2d array containg measured heights
-    data = [[]]
+    # 2d array containg measured heights, first dimension: time, second dimension: location
+    data = None
 
     # array containing locations (as metadata)
-    locations = []
+    locations = None
 
     # detected dimension (2d or 1d)
     dimension = -1
 
     # array containg times of measurements
-    times = []
+    times = None
 
     NaNHandling = Enum("NaNHandling", "none replace")
 
@@ -62,7 +62,10 @@ class FreeSurfaceEvaluation(Evaluation):
         :return: stored measurements as a 1d numpy array
         :rtype: numpy array with size totalCount
         """
-        return np.reshape(np.array(self.data),-1)
+        # a read-only view instead of a copy, so the stored measurements can not be changed by accident
+        array = np.asarray(self.data, dtype=np.float64).ravel().view()
+        array.flags.writeable = False
+        return array
 
     @staticmethod
     def hasSameLocations(A, B):
@@ -135,8 +138,8 @@ class FreeSurfaceEquilibriumEvaluation(FreeSurfaceEvaluation):
     """
     def __init__(self, data, locations, dimension, time=0):
         """Class constructor
-        :param data: 1-dimensional data array
-        :type data: list of numbers
+        :param data: data array, containing the measurements of the single timestep
+        :type data: list of list of numbers or 2d numpy array
         :param locations: list of locations for this measurement
         :type locations: list of numbers
         :param dimension: dimension of the problem
@@ -144,10 +147,10 @@ class FreeSurfaceEquilibriumEvaluation(FreeSurfaceEvaluation):
         :param time: time of the measurement (only one time here!)
         :type time: number, optional
         """
-        self.data = data
+        self.data = np.asarray(data, dtype=np.float64).reshape(1, -1)
         self.locations = locations
         self.dimension = dimension
-        self.times = [time]
+        self.times = np.array([time], dtype=np.float64)
 
     @classmethod
     def fromCSV(cls, filename, dim, delimiter=',', valuecolumn="Value", dimcolumns=["X", "Y"]):
@@ -211,8 +214,8 @@ class FreeSurfaceEquilibriumEvaluation(FreeSurfaceEvaluation):
         :return: the constructed FreeSurfaceEquilibriumEvaluation
         :rtype: FreeSurfaceEquilibriumEvaluation
         """
-        data_reformatted = np.array(data).reshape((seriesformat.timeCount,
-                                                   seriesformat.locationCount)).tolist()
+        data_reformatted = np.asarray(data, dtype=np.float64).reshape((seriesformat.timeCount,
+                                                                       seriesformat.locationCount))
         dim = 2
         if hasattr(seriesformat, "dimension"):
             dim = seriesformat.dimension
@@ -305,9 +308,9 @@ class FreeSurfaceTimeDependentEvaluation(FreeSurfaceEvaluation):
         """ Class constructor
 
         :param data: 2d array of numbers, first dimension: time, second(inner) dimension location
-        :type data: list of list of numbers
+        :type data: list of list of numbers or 2d numpy array
         :param times: the times measured (in simulation time)
-        :type times: list of numbers
+        :type times: list of numbers or numpy array
         :param locations: the locations measured
         :type locations: list of numbers or list of tuples (3d case)
         :param dimension: dimension of the problem
@@ -319,8 +322,8 @@ class FreeSurfaceTimeDependentEvaluation(FreeSurfaceEvaluation):
         :param runtime: runtime of the evaluation this data resulted from, in seconds
         :type runtime: int, optional
         """
-        self.data = data
-        self.times = times
+        self.times = np.asarray(times, dtype=np.float64)
+        self.data = np.asarray(data, dtype=np.float64).reshape(len(self.times), len(locations))
         self.locations = locations
         self.dimension = dimension
         self.eval_id = eval_id
@@ -488,8 +491,8 @@ class FreeSurfaceTimeDependentEvaluation(FreeSurfaceEvaluation):
         :return: the constructed FreeSurfaceTimeDependentEvaluation
         :rtype: FreeSurfaceTimeDependentEvaluation
         """
-        data_reformatted = np.array(data).reshape((seriesformat.timeCount,
-                                                   seriesformat.locationCount)).tolist()
+        data_reformatted = np.asarray(data, dtype=np.float64).reshape((seriesformat.timeCount,
+                                                                       seriesformat.locationCount))
         dim = 2
         if hasattr(seriesformat, "dimension"):
             dim = seriesformat.dimension
@@ -518,54 +521,33 @@ class FreeSurfaceTimeDependentEvaluation(FreeSurfaceEvaluation):
         if isinstance(target, FreeSurfaceEquilibriumEvaluation):
             return np.array(self.data[-1])
 
+        # nothing to interpolate if the target was measured at the same times
+        if target is self or target.times is self.times or np.array_equal(target.times, self.times):
+            return self.getNumpyArray()
 
-        array = np.zeros(len(target.times)*len(target.locations))
-        for i, targettime in enumerate(target.times):
-            # find nearest entries in this instances time field
-            nearest_lower = 0
+        times = np.asarray(self.times, dtype=np.float64)
+        data = np.asarray(self.data, dtype=np.float64)
+        targettimes = np.asarray(target.times, dtype=np.float64)
 
-            # first, find the time with the maximum index lower or equal to targettime
-            while True:
-                if self.times[nearest_lower] == targettime:
-                    # found a perfect match!
-                    array[i*len(target.locations): \
-                        ((i+1)*len(target.locations))] = \
-                        self.data[nearest_lower]
-                    break
+        if len(times) == 1:
+            return np.tile(data[0], len(targettimes))
 
-                if nearest_lower == self.timeCount-1:
-                    # at the edge...
-                    array[i*len(target.locations): \
-                        ((i+1)*len(target.locations))] = \
-                        self.data[nearest_lower]
-                    break
+        # find the interval [times[lower], times[lower+1]] of every target time using a binary search
+        lower = np.clip(np.searchsorted(times, targettimes, side="right") - 1, 0, len(times) - 2)
 
-                if self.times[nearest_lower] < targettime:
-                    if self.times[nearest_lower+1] > targettime:
-                        # found it
-                        # interpolate
-                        higherdata = np.array(self.data[nearest_lower+1])
-                        highertime = self.times[nearest_lower+1]
-                        lowerdata = np.array(self.data[nearest_lower])
-                        lowertime = self.times[nearest_lower]
-
-                        percentage = (targettime-lowertime) / (highertime-lowertime)
-                        interpolated = percentage*higherdata + (1-percentage)*lowerdata
-
-                        array[i*len(target.locations): \
-                            ((i+1)*len(target.locations))] = \
-                            interpolated
-                        break
-                    nearest_lower += 1
-
-                # if we are here, self.times[nearest_lower] > targettime....
-                if nearest_lower == 0:
-                    array[i*len(target.locations): \
-                        ((i+1)*len(target.locations))] = \
-                        self.data[nearest_lower]
-                    break
+        # clipping the percentage clamps target times outside of the times measured to the edges
+        percentage = (targettimes - times[lower]) / (times[lower + 1] - times[lower])
+        percentage = np.clip(percentage, 0, 1)[:, None]
 
-        return array
+        lowerdata = data[lower]
+        higherdata = data[lower + 1]
+        interpolated = percentage*higherdata + (1-percentage)*lowerdata
+
+        # use exact matches as they are, so NaNs of the neighbouring timestep do not spread
+        interpolated = np.where(percentage == 0, lowerdata, interpolated)
+        interpolated = np.where(percentage == 1, higherdata, interpolated)
+
+        return interpolated.ravel()
 
     def writeCSVAveragedOverLocation(self, filename):
         """Writes a tsv with a entry for every timestep measured. The entry will be the
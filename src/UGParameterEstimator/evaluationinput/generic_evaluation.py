@@ -1,15 +1,78 @@
 """Module for generic evaluations, which are evaluations containing only one scalar value at 
 multiple timesteps, stored in json or csv format."""
+import io
 import os
 import csv
 import json
+import mmap
+from array import array
+import warnings
 import numpy as np
 from .evaluation import Evaluation, ErroredEvaluation
 from UGParameterEstimator import setup_logger
 
+try:
+    from orjson import loads as json_loads
+    # orjson parses any buffer, so files can be memory mapped instead of read into a copy
+    json_loads_buffers = True
+except ImportError:
+    # orjson is optional, the standard library parser is used as fallback
+    from json import loads as json_loads
+    json_loads_buffers = False
+
+try:
+    import ijson
+except ImportError:
+    # ijson is optional, large files are parsed as a whole without it
+    ijson = None
+
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional, the groups are interpolated using np.interp without it
+    njit = None
+
 evaluationInput_generic_logger = setup_logger.logger.getChild("evaluationInput_generic")
 
 
+if njit is not None:
+    # compiled eagerly for the only signature used, so the first evaluation does not wait for
+    # the compiler. with cache=True, this is loaded from the cache after the first run. it
+    # releases the GIL, so evaluations can be interpolated in parallel threads
+    @njit("void(float64[:], float64[:], float64[:], int64[:], int64[:], float64[:])", cache=True, nogil=True)
+    def _interpolateGroups(times, data, target_times, source_bounds, target_bounds, out):
+        """Interpolates all groups (between two discontinuities) of the target times at once,
+        with the same results as calling np.interp for each group.
+        Group g of the source is times[source_bounds[g]:source_bounds[g+1]], the same for the target.
+
+        :param times: times of the data, ascending within each group
+        :type times: numpy array, float64
+        :param data: data at times
+        :type data: numpy array, float64
+        :param target_times: times to interpolate to
+        :type target_times: numpy array, float64
+        :param source_bounds: start indices of the groups of times, followed by len(times)
+        :type source_bounds: numpy array, int64
+        :param target_bounds: start indices of the groups of target_times, followed by len(target_times)
+        :type target_bounds: numpy array, int64
+        :param out: output array, same size as target_times
+        :type out: numpy array, float64
+        """
+        for g in range(len(target_bounds) - 1):
+            lower = source_bounds[g]
+            upper = source_bounds[g + 1] - 1
+            for k in range(target_bounds[g], target_bounds[g + 1]):
+                t = target_times[k]
+                if t <= times[lower]:
+                    out[k] = data[lower]
+                elif t >= times[upper]:
+                    out[k] = data[upper]
+                else:
+                    j = lower + np.searchsorted(times[lower:upper + 1], t, side="right") - 1
+                    slope = (data[j + 1] - data[j]) / (times[j + 1] - times[j])
+                    out[k] = slope * (t - times[j]) + data[j]
+
+
 class GenericEvaluation(Evaluation):
     """Class implementing a parser for evaluations containing only one
     scalar value at multiple timesteps, stored in the following json format:
@@ -45,16 +108,35 @@ class GenericEvaluation(Evaluation):
 
     """
 
-    data = []
-    times = []
+    data = None
+    times = None
+
+    # lazily computed group start indices and bounds, together with the times array they belong to
+    _splitcache = None
+    _boundscache = None
+
+    # the last result of getNumpyArrayLike, together with the target and arrays it was computed from.
+    # optimizers interpolate the same evaluation to the same target several times per iteration
+    _likecache = None
+
+    # file suffixes of measurements and the parsers used for them, in order of preference
+    fileFormats = [("_measurement.csv", "fromCSV"),
+                   ("_measurement.json", "fromJSON")]
+
+    # if set, parsed measurements are stored next to the measurement file as <file>.npz
+    # and loaded from there as long as the measurement file is not modified
+    npzCache = False
+
+    # json files larger than this (in bytes) are parsed incrementally using ijson, if available
+    streamingThreshold = 10 * 1024 * 1024
 
     def __init__(self, data, times, eval_id=-1, parameters=None, runtime=None):
         """ Class constructor
 
         :param data: 1d array of numbers representing the measured for each timestep
-        :type data: list of numbers
+        :type data: list of numbers or numpy array
         :param times: the times measured (in simulation time)
-        :type times: list of numbers
+        :type times: list of numbers or numpy array
         :param eval_id: id of the evaluation this data resulted from
         :type eval_id: int, optional
         :param parameters: (transformed) parameters of the evaluation this data resulted from
@@ -62,12 +144,18 @@ class GenericEvaluation(Evaluation):
         :param runtime: runtime of the evaluation this data resulted from, in seconds
         :type runtime: int, optional
         """
-        self.data = data
-        self.times = times
+        self.data = np.asarray(data, dtype=np.float64)
+        self.times = np.asarray(times, dtype=np.float64)
         self.eval_id = eval_id
         self.parameters = parameters
         self.runtime = runtime
 
+    def __getstate__(self):
+        # the interpolation cache references the target, which should not be stored with every evaluation
+        state = self.__dict__.copy()
+        state.pop("_likecache", None)
+        return state
+
     @property
     def timeCount(self):
         """Returns the number of measurements stored in this object
@@ -77,13 +165,43 @@ class GenericEvaluation(Evaluation):
         """
         return len(self.times)
 
+    @property
+    def splitIndices(self):
+        """Returns the indices where the times decrease, i.e. where the groups of times between
+        two discontinuities start. Computed once and cached as long as times is not replaced.
+
+        :return: start indices of all groups but the first one
+        :rtype: numpy array of ints
+        """
+        if self._splitcache is None or self._splitcache[0] is not self.times:
+            times = np.asarray(self.times, dtype=np.float64)
+            self._splitcache = (self.times, np.flatnonzero(np.diff(times) < 0) + 1)
+        return self._splitcache[1]
+
+    @property
+    def groupBounds(self):
+        """Returns the start indices of all groups of times between two discontinuities, followed
+        by the number of times. Computed once and cached as long as times is not replaced, so an
+        evaluation used as target of many interpolations provides them without any work.
+
+        :return: bounds of the groups, group g is times[bounds[g]:bounds[g+1]]
+        :rtype: numpy array of int64
+        """
+        if self._boundscache is None or self._boundscache[0] is not self.times:
+            bounds = np.concatenate(([0], self.splitIndices, [len(self.times)])).astype(np.int64)
+            self._boundscache = (self.times, bounds)
+        return self._boundscache[1]
+
     def getNumpyArray(self):
         """Returns stored measurements as a 1d numpy array
 
         :return: stored measurements as a 1d numpy array
         :rtype: numpy array, 1d
         """
-        return np.array(self.data)
+        # a read-only view instead of a copy, so the stored measurements can not be changed by accident
+        array = np.asarray(self.data, dtype=np.float64).ravel().view()
+        array.flags.writeable = False
+        return array
 
     def getNumpyArrayLike(self, target):
         """Used to interpolate between different evaluations, when timestamps might differ because
@@ -92,73 +210,161 @@ class GenericEvaluation(Evaluation):
         :param target: Evaluation whichs format should be matched and interpolated to
         :type target: Evaluation
         :raises IncompatibleFormatError: When the two Evaluations can not be interpolated between
-        :return: the data of this evaulation, interpolated to the targets format
+        :return: the data of this evaulation, interpolated to the targets format. The array is read-only
         :rtype: numpy array
         """
 
         if not isinstance(target, GenericEvaluation):
             raise Evaluation.IncompatibleFormatError("Target not compatible!")
 
-        array = np.zeros(target.timeCount)
-        array_values = []
+        # nothing to interpolate if the target was measured at the same times
+        if target is self or target.times is self.times:
+            return self.getNumpyArray()
+
+        key = (target, target.times, self.times, self.data)
+        if self._likecache is not None and all(a is b for a, b in zip(self._likecache[0], key)):
+            return self._likecache[1]
+
+        if np.array_equal(target.times, self.times):
+            array = self.getNumpyArray()
+        else:
+            array = np.concatenate(self.getInterpolatedGroups(target))
+            # the same array is returned to every caller, so none of them may change it
+            array.flags.writeable = False
 
-        # split array at discontinuities
-        def split_sorted_array(arr, split_arr):
-            split_indices = np.where(np.diff(arr) < 0)[0] + 1
-            split_arr = np.split(split_arr, split_indices)
-            return split_arr
+        self._likecache = (key, array)
+        return array
+
+    def getInterpolatedGroups(self, target):
+        """Interpolates the data of this evaluation to the times of the target, separately for
+        every group of the targets times between two discontinuities (i.e. where the time
+        decreases). Concatenated, the groups form the result of getNumpyArrayLike.
+
+        :param target: Evaluation whichs format should be matched and interpolated to
+        :type target: GenericEvaluation
+        :raises IncompatibleFormatError: When the two Evaluations can not be interpolated between
+        :return: the interpolated data, one array per group of the target
+        :rtype: list of numpy arrays
+        """
+        times = np.asarray(self.times, dtype=np.float64)
+        # the compiled kernel only accepts writable arrays, it does not modify them
+        data = np.asarray(self.data, dtype=np.float64).ravel()
+        target_times = np.asarray(target.times, dtype=np.float64)
 
-        split_times = split_sorted_array(self.times, self.times)
-        split_data = split_sorted_array(self.times, self.data)
-        split_target = split_sorted_array(target.times, target.times)
+        # find the discontinuities, i.e. where the time decreases. this is the only validation
+        # needed, as every group is sorted afterwards. times and data share the same indices
+        split_indices = self.splitIndices
+        target_indices = target.splitIndices
 
-        if len(split_times) > 1 and len(split_times) != len(split_target):
+        if len(split_indices) != len(target_indices):
             evaluationInput_generic_logger.debug("Target and data not the same discontinuities")
-            evaluationInput_generic_logger.debug(f"len(split_times) = {len(split_times)}; len(split_target) = {len(split_target)}")
+            evaluationInput_generic_logger.debug(f"len(split_times) = {len(split_indices) + 1}; len(split_target) = {len(target_indices) + 1}")
             raise Evaluation.IncompatibleFormatError("Target and data not the same discontinuities")
 
-        # interpolate
-        for i, target_group in enumerate(split_target):  # iterate over target groups
-            array_values.append(np.zeros(len(target_group)))  # create array for this group
-            for j, target_time in enumerate(target_group):  # iterate over target times
-                # find nearest entries in this instances time list
-                nearest_lower = 0
-
-                # first, find the time with the maximum index lower or equal to targettime
-                while True:
-                    if split_times[i][nearest_lower] == target_time:
-                        # found perfect match!
-                        array_values[i][j] = split_data[i][nearest_lower]
-                        break
-
-                    if nearest_lower == len(split_times[i]) - 1:
-                        # at the edge...
-                        array_values[i][j] = split_data[i][nearest_lower]
-                        break
-
-                    if split_times[i][nearest_lower] < target_time:
-                        if split_times[i][nearest_lower + 1] > target_time:
-                            # found it
-                            # interpolate
-                            higherdata = np.array(split_data[i][nearest_lower + 1])
-                            highertime = split_times[i][nearest_lower + 1]
-                            lowerdata = np.array(split_data[i][nearest_lower])
-                            lowertime = split_times[i][nearest_lower]
-
-                            percentage = (target_time - lowertime) / (highertime - lowertime)
-                            interpolated = percentage * higherdata + (1 - percentage) * lowerdata
-
-                            array_values[i][j] = interpolated
-                            break
-                        nearest_lower += 1
-
-                    # if we are here, split_times[i][nearest_lower] > target_time
-                    if nearest_lower == 0:
-                        array_values[i][j] = split_data[i][nearest_lower]
-                        break
-
-        array = np.concatenate(array_values)
-        return array
+        # interpolate each group of the target. target times outside of the times measured are
+        # clamped to the first/last value
+        if njit is not None and len(times) > 0:
+            array = np.empty(len(target_times))
+            _interpolateGroups(times,
+                               data,
+                               target_times,
+                               self.groupBounds,
+                               target.groupBounds,
+                               array)
+            return np.split(array, target_indices)
+
+        # the groups are only needed here, the kernel above works on the bounds directly
+        split_times = np.split(times, split_indices)
+        split_data = np.split(data, split_indices)
+        split_target = np.split(target_times, target_indices)
+
+        return [np.interp(target_group, split_times[i], split_data[i])
+                for i, target_group in enumerate(split_target)]
+
+    def squaredResidualTo(self, target, targetdata=None):
+        """Computes the squared euclidean norm of the residual to the target without building
+        the whole interpolated measurement: the residual is accumulated group by group.
+
+        :param target: target evaluation, this evaluation is interpolated to its format
+        :type target: Evaluation
+        :param targetdata: target.getNumpyArray(), if already available
+        :type targetdata: numpy array, optional
+        :raises IncompatibleFormatError: When the two Evaluations can not be interpolated between
+        :return: squared norm of the residual
+        :rtype: float
+        """
+        if not isinstance(target, GenericEvaluation):
+            raise Evaluation.IncompatibleFormatError("Target not compatible!")
+
+        if targetdata is None:
+            targetdata = target.getNumpyArray()
+
+        if target is self or target.times is self.times or np.array_equal(target.times, self.times):
+            residual = self.getNumpyArray() - targetdata
+            return float(residual.dot(residual))
+
+        squarednorm = 0.0
+        offset = 0
+        for group in self.getInterpolatedGroups(target):
+            group -= targetdata[offset:offset + len(group)]
+            squarednorm += group.dot(group)
+            offset += len(group)
+        return float(squarednorm)
+
+    @staticmethod
+    def loadCSVColumns(filename):
+        """Fast path for parsing the csv format described: Reads the time and value columns of
+        finished, plain csv files in one go using numpy.
+        Repeated headers (written when running in parallel) are skipped as comments.
+        Files which can not be handled this way (no FINISHED line at the end, a commented header,
+        comment markers or repeated headers not at the start of a line or other non numeric rows)
+        return None and should be parsed row by row.
+
+        :param filename: file to parse
+        :type filename: string
+        :return: times and values, or None if the file can not be handled by the fast path
+        :rtype: tuple (numpy array, numpy array)
+        """
+        with open(filename, "rb") as csvfile:
+            content = csvfile.read()
+
+        headerline = content.split(b"\n", 1)[0].decode().strip()
+        header = headerline.split(",")
+
+        if header[0].startswith("#") or "time" not in header or "value" not in header:
+            return None
+
+        # the FINISHED line has to be the last line of the file, and the only one, as parsing ends there
+        lines = content[max(0, len(content) - 256):].rstrip(b"\r\n").splitlines()
+        if not lines or lines[-1].split(b",")[0] != b"FINISHED" or content.count(b"FINISHED") != 1:
+            return None
+
+        # numpy removes comments anywhere in a line, the row by row parsing only skips lines starting with them.
+        # so every # has to start a line, and every occurence of the header has to be a whole line
+        if content.count(b"#") != content.count(b"\n#"):
+            return None
+        headerbytes = headerline.encode()
+        occurences = content.count(headerbytes)
+        if (occurences != content.startswith(headerbytes) + content.count(b"\n" + headerbytes)
+                or occurences != content.count(headerbytes + b"\n") + content.count(headerbytes + b"\r\n")):
+            return None
+
+        try:
+            with warnings.catch_warnings():
+                # files without any data rows are valid
+                warnings.simplefilter("ignore", UserWarning)
+                # parse the content checked above, not the file again
+                columns = np.loadtxt(io.BytesIO(content),
+                                     delimiter=",",
+                                     skiprows=1,
+                                     usecols=(header.index("time"), header.index("value")),
+                                     comments=("#", "FINISHED", headerline),
+                                     dtype=np.float64,
+                                     ndmin=2)
+        except ValueError:
+            return None
+
+        return columns[:, 0], columns[:, 1]
 
     @classmethod
     def fromCSV(cls, filename, evaluation_id=-1, parameters=None, runtime=None):
@@ -176,46 +382,66 @@ class GenericEvaluation(Evaluation):
         :rtype: Evaluation
         """
 
-        parsedevaluation = cls([], [], evaluation_id, parameters, runtime)
         evaluationInput_generic_logger.debug(f"Reading csv file from {filename}...")
 
-        with open(filename) as csvfile:
-            reader = csv.DictReader(csvfile)
+        columns = cls.loadCSVColumns(filename)
+        if columns is not None:
+            times, data = columns
+            return cls(data, times, evaluation_id, parameters, runtime)
+
+        # fall back to parsing row by row. the number of valid rows is not known beforehand,
+        # so collect them in typed arrays, which store plain doubles and are used by numpy as is
+        data = array("d")
+        times = array("d")
+
+        with open(filename, newline="") as csvfile:
+            reader = csv.reader(csvfile)
 
             evaluationInput_generic_logger.debug(f"csv file read: {reader}")
 
+            # the first row is the header, the columns are accessed by their index
+            header = next(reader, [""])
+            commented_header = header[0].startswith("#")
+            time_index = header.index("time") if "time" in header else None
+            value_index = header.index("value") if "value" in header else None
+
             isfinished = False
             for row in reader:
-                if list(row.values())[0].startswith("#") or list(row.keys())[0].startswith("#"):  # skip lines starting with #
+                if not row:
+                    continue
+
+                if row[0].startswith("#") or commented_header:  # skip lines starting with #
                     evaluationInput_generic_logger.debug(f"Found commented line in csv file: {row}")
                     continue
 
-                if "value" not in row or "time" not in row:
+                if time_index is None or value_index is None:
                     evaluationInput_generic_logger.debug(f"Neither value nor time as key in row")
                     return ErroredEvaluation(parameters,
                                              "Malformed data entry!",
                                              evaluation_id,
                                              runtime)
 
-                if list(row.values())[0] == "FINISHED":
+                if row[0] == "FINISHED":
                     evaluationInput_generic_logger.debug(f"Reached end of csv file")
                     isfinished = True
                     break
 
-                # ignore header in all possibilities because of multiprocessing
-                numeric_data = True
-                for key in ["value", "time"]:
-                    if "value" in row[key] or "time" in row[key] or "step" in row[key]:
-                        numeric_data = False
-                        break
-                if not numeric_data:
+                # skip rows cut off, e.g. when the run was aborted while writing
+                if len(row) <= max(time_index, value_index):
+                    continue
+
+                # ignore repeated headers (because of multiprocessing) and other non numeric rows
+                try:
+                    value = float(row[value_index])
+                    time = float(row[time_index])
+                except ValueError:
                     continue
 
-                parsedevaluation.data.append(float(row["value"]))
-                parsedevaluation.times.append(float(row["time"]))
+                data.append(value)
+                times.append(time)
 
         if isfinished:
-            return parsedevaluation
+            return cls(data, times, evaluation_id, parameters, runtime)
         evaluationInput_generic_logger.debug("Did not find FINISHED line, but all rows were read. Raising error...")
         return ErroredEvaluation(parameters,
                                  "Evaluation did not finish correctly",
@@ -237,11 +463,19 @@ class GenericEvaluation(Evaluation):
         :return: the parsed evaluation, or ErroredEvaluation if an error occurred.
         :rtype: Evaluation
         """
+        if ijson is not None and os.path.getsize(filename) > cls.streamingThreshold:
+            return cls.fromJSONStreaming(filename, evaluation_id, parameters, runtime)
+
         # parse the file
         parsedjson = {}
-        with open(filename) as jsonfile:
+        with open(filename, "rb") as jsonfile:
             try:
-                parsedjson = json.load(jsonfile)
+                if json_loads_buffers and os.fstat(jsonfile.fileno()).st_size > 0:
+                    with mmap.mmap(jsonfile.fileno(), 0, access=mmap.ACCESS_READ) as mapped, \
+                         memoryview(mapped) as view:
+                        parsedjson = json_loads(view)
+                else:
+                    parsedjson = json_loads(jsonfile.read())
             except json.JSONDecodeError as exception:
                 return ErroredEvaluation(parameters,
                                          "Error parsing json file: " + exception.msg,
@@ -264,19 +498,141 @@ class GenericEvaluation(Evaluation):
                                      evaluation_id,
                                      runtime)
 
-        parsedevaluation = cls([], [], evaluation_id, parameters, runtime)
+        elements = parsedjson["data"]
+        if not all("value" in element and "time" in element for element in elements):
+            return ErroredEvaluation(parameters,
+                                     "Malformed data entry!",
+                                     evaluation_id,
+                                     runtime)
+
+        # extract the columns directly into float64 arrays
+        return cls(np.fromiter((element["value"] for element in elements), np.float64, len(elements)),
+                   np.fromiter((element["time"] for element in elements), np.float64, len(elements)),
+                   evaluation_id,
+                   parameters,
+                   runtime)
+
+    @classmethod
+    def fromJSONStreaming(cls, filename, evaluation_id=-1, parameters=None, runtime=None):
+        """Parses this evaluation from the json format described, without loading the whole
+        file into memory: the entries are read one by one using ijson and written to numpy
+        buffers, which double their size when full. Used by fromJSON for large files.
 
-        # parse data into internal arrays
-        for element in parsedjson["data"]:
-            if "value" not in element or "time" not in element:
+        :param filename: file to parse
+        :type filename: string
+        :param evaluation_id: id of the evaluation this data resulted from
+        :type evaluation_id: int, optional
+        :param parameters: (transformed) parameters of the evaluation this data resulted from
+        :type parameters: numpy array, optional
+        :param runtime: runtime of the evaluation this data resulted from, in seconds
+        :type runtime: int, optional
+        :return: the parsed evaluation, or ErroredEvaluation if an error occurred.
+        :rtype: Evaluation
+        """
+        hasdata = False
+        hasfinished = False
+        finished = False
+        malformedentry = False
+
+        times = np.empty(1024)
+        data = np.empty(1024)
+        count = 0
+        element = {}
+
+        with open(filename, "rb") as jsonfile:
+            try:
+                for prefix, event, value in ijson.parse(jsonfile, use_float=True):
+                    # almost all events belong to the data entries, so check for them first
+                    if prefix == "data.item.time":
+                        element["time"] = value
+                    elif prefix == "data.item.value":
+                        element["value"] = value
+                    elif prefix == "data.item":
+                        if event == "start_map":
+                            element = {}
+                        elif event == "end_map":
+                            if "time" not in element or "value" not in element:
+                                malformedentry = True
+                                continue
+                            if count == len(times):
+                                times = np.resize(times, 2 * count)
+                                data = np.resize(data, 2 * count)
+                            times[count] = element["time"]
+                            data[count] = element["value"]
+                            count += 1
+                    elif prefix == "data":
+                        hasdata = True
+                    elif prefix == "metadata" and event == "map_key" and value == "finished":
+                        hasfinished = True
+                    elif prefix == "metadata.finished":
+                        finished = bool(value)
+            except ijson.JSONError as exception:
                 return ErroredEvaluation(parameters,
-                                         "Malformed data entry!",
+                                         "Error parsing json file: " + str(exception),
                                          evaluation_id,
                                          runtime)
-            parsedevaluation.data.append(element["value"])
-            parsedevaluation.times.append(element["time"])
 
-        return parsedevaluation
+        # check correct format
+        if not hasdata or not hasfinished:
+            return ErroredEvaluation(parameters,
+                                     "Evaluation json is malformed.",
+                                     evaluation_id,
+                                     runtime)
+
+        # check that the evaluation did finish correctly
+        if not finished:
+            return ErroredEvaluation(parameters,
+                                     "Evaluation did not finish correctly",
+                                     evaluation_id,
+                                     runtime)
+
+        if malformedentry:
+            return ErroredEvaluation(parameters,
+                                     "Malformed data entry!",
+                                     evaluation_id,
+                                     runtime)
+
+        # copy, so the unused part of the buffers is freed
+        return cls(data[:count].copy(), times[:count].copy(), evaluation_id, parameters, runtime)
+
+    @classmethod
+    def fromCachedFile(cls, filename, parser, evaluation_id=-1, parameters=None, runtime=None):
+        """Loads the evaluation from the .npz cache file stored next to the measurement file,
+        if it is not older than the measurement file. Otherwise the measurement file is parsed
+        and, if successful, the cache file is written.
+
+        :param filename: measurement file to parse
+        :type filename: string
+        :param parser: name of the classmethod parsing the measurement file, e.g. "fromCSV"
+        :type parser: string
+        :param evaluation_id: id of the evaluation this data resulted from
+        :type evaluation_id: int, optional
+        :param parameters: (transformed) parameters of the evaluation this data resulted from
+        :type parameters: numpy array, optional
+        :param runtime: runtime of the evaluation this data resulted from, in seconds
+        :type runtime: int, optional
+        :return: the parsed evaluation, or ErroredEvaluation if an error occurred.
+        :rtype: Evaluation
+        """
+        cachefilename = filename + ".npz"
+
+        if os.path.isfile(cachefilename) and os.path.getmtime(cachefilename) >= os.path.getmtime(filename):
+            try:
+                with np.load(cachefilename) as cached:
+                    return cls(cached["data"], cached["times"], evaluation_id, parameters, runtime)
+            except (OSError, ValueError, KeyError):
+                evaluationInput_generic_logger.debug(f"Could not read cache file {cachefilename}, parsing {filename}")
+
+        evaluation = getattr(cls, parser)(filename, evaluation_id, parameters, runtime)
+
+        # unfinished or malformed measurements are not cached, they are reported again on the next parse
+        if not isinstance(evaluation, ErroredEvaluation):
+            try:
+                np.savez(cachefilename, times=evaluation.times, data=evaluation.data)
+            except OSError:
+                evaluationInput_generic_logger.debug(f"Could not write cache file {cachefilename}")
+
+        return evaluation
 
     @classmethod
     def parse(cls, directory, evaluation_id, parameters=None, runtime=None):
@@ -295,15 +651,15 @@ class GenericEvaluation(Evaluation):
         :rtype: Evaluation
         """
 
-        # construct filename
-        filename_json = os.path.join(directory, str(evaluation_id) + "_measurement.json")
-        filename_csv = os.path.join(directory, str(evaluation_id) + "_measurement.csv")
+        # the format is determined by the file suffix, so no parser has to fail first
+        for suffix, parser in GenericEvaluation.fileFormats:
+            filename = os.path.join(directory, str(evaluation_id) + suffix)
+            if os.path.isfile(filename):
+                if GenericEvaluation.npzCache:
+                    return GenericEvaluation.fromCachedFile(filename, parser, evaluation_id, parameters, runtime)
+                return getattr(GenericEvaluation, parser)(filename, evaluation_id, parameters, runtime)
 
-        if not os.path.isfile(filename_csv):
-            if not os.path.isfile(filename_json):
-                return ErroredEvaluation(parameters,
-                                         "No measurement file found.",
-                                         evaluation_id,
-                                         runtime)
-            return GenericEvaluation.fromJSON(filename_json, evaluation_id, parameters, runtime)
-        return GenericEvaluation.fromCSV(filename_csv, evaluation_id, parameters, runtime)
+        return ErroredEvaluation(parameters,
+                                 "No measurement file found.",
+                                 evaluation_id,
+                                 runtime)
@@ -1,14 +1,18 @@
 import subprocess
 import os
-import io
 import time
-import csv
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import shutil
 from shutil import copyfile
 from UGParameterEstimator import ParameterManager, Evaluation, ParameterOutputAdapter, ErroredEvaluation, setup_logger
 from .evaluator import Evaluator
 
 cluster_logger = setup_logger.logger.getChild("clusterEvaluator")
 
+def _parseEvaluation(evaluation_type, directory, evaluation_id, parameters, runtime):
+    # module level, so it can be called in the worker processes of a ProcessPoolExecutor
+    return evaluation_type.parse(directory, evaluation_id, parameters, runtime)
+
 class ClusterEvaluator(Evaluator):
     """Evaluator for Clusters supporting UGSUBMIT.
 
@@ -21,7 +25,11 @@ class ClusterEvaluator(Evaluator):
     Output of UG4 is redirected into a separate <id>_ug_output.txt file.
 
     """
-    def __init__(self, luafilename, directory, parametermanager: ParameterManager, evaluation_type, parameter_output_adapter: ParameterOutputAdapter, fixedparameters={}, threadcount=10, cliparameters=[], ugsubmitparameters=[], weight=[]):
+
+    # number of consecutive polls without usable uginfo output before giving up
+    maxfailedpolls = 5
+
+    def __init__(self, luafilename, directory, parametermanager: ParameterManager, evaluation_type, parameter_output_adapter: ParameterOutputAdapter, fixedparameters={}, threadcount=10, cliparameters=[], ugsubmitparameters=[], weight=[], submissionthreads=1, parsingprocesses=1):
         """Class constructor
 
         :param luafilename: path to the luafile to call for every evaluation
@@ -42,6 +50,13 @@ class ClusterEvaluator(Evaluator):
                 for places that would normally require a space.
         :param weight: list of weights for each parameter
         :type cliparameters: list of strings, optional
+        :param submissionthreads: number of jobs submitted concurrently, defaults to 1. With 1, jobs are
+                submitted one after another with a pause of one second, as some schedulers need this.
+        :type submissionthreads: int, optional
+        :param parsingprocesses: number of processes parsing the measurement files, defaults to 1.
+                Note that class attributes of the evaluation type changed at runtime (e.g. nanhandling)
+                only reach the worker processes if they are started by forking.
+        :type parsingprocesses: int, optional
         """
         self.directory = directory
         self.parametermanager = parametermanager
@@ -56,13 +71,12 @@ class ClusterEvaluator(Evaluator):
         self.cliparameters = cliparameters
         self.ugsubmitparameters = ugsubmitparameters
         self.weight = weight
+        self.submissionthreads = submissionthreads
+        self.parsingprocesses = parsingprocesses
 
-        if not os.path.exists(self.directory):
-            os.mkdir(self.directory)
-
-        filelist = list(os.listdir(self.directory))
-        for f in filelist:
-            os.remove(os.path.join(self.directory, f))
+        # start with an empty exchange directory, including subdirectories left over
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
 
     @property
     def parallelism(self):
@@ -73,7 +87,7 @@ class ClusterEvaluator(Evaluator):
         """
         return self.threadcount
 
-    def evaluate(self, evaluationlist, transform=True, tag=""):
+    def evaluate(self, evaluationlist, transform=True, tag="", check_cache=True):
         """Evaluates the parameters given in evaluationlist using UG4, and the adapters set in the constructor.
 
         :param evaluationlist: parametersets to evaluate
@@ -82,6 +96,9 @@ class ClusterEvaluator(Evaluator):
         :type transform: boolean, optional
         :param tag: tag-string attached to all produced evaluations for analysis purposes
         :type tag: string
+        :param check_cache: wether to look up the parameters in the cache first, for all or per parameterset,
+                defaults to true. Parametersets known to be new (e.g. finite differencing steps) can skip it.
+        :type check_cache: boolean or list of booleans, optional
         :return: list of parsed evaluation objects with the type given in the constructor, or ErroredEvaluation
         :rtype: list of Evaluation
         """
@@ -90,6 +107,7 @@ class ClusterEvaluator(Evaluator):
         evaluationids = [None] * len(evaluationlist)
         beta = [None] * len(evaluationlist)
         starttimes = [None] * len(evaluationlist)
+        cachechecks = self.getCacheChecks(check_cache, len(evaluationlist))
 
         for j, beta_j in enumerate(evaluationlist):
             if transform:
@@ -99,19 +117,14 @@ class ClusterEvaluator(Evaluator):
             else:
                 beta[j] = beta_j
 
-            if results[j] is None:
+            if results[j] is None and cachechecks[j]:
                 results[j] = self.checkCache(beta[j])
 
-        for j in range(len(evaluationlist)):
-
-            if results[j] is not None:
-                continue
-
-            starttimes[j] = time.time()
-
-            absolute_directory_path = os.getcwd() + "/" + self.directory
-            absolute_script_path = os.getcwd() + "/" + self.luafilename
+        # the paths are the same for all jobs, so resolve and check them only once
+        absolute_directory_path = os.path.abspath(self.directory)
+        absolute_script_path = os.path.abspath(self.luafilename)
 
+        if any(result is None for result in results):
             if not os.path.isfile(absolute_script_path):
                 cluster_logger.error(f"Luafile not found! {absolute_script_path}")
                 exit()
@@ -119,6 +132,14 @@ class ClusterEvaluator(Evaluator):
                 cluster_logger.error(f"Exchange directory not found! {absolute_directory_path}")
                 exit()
 
+        submissions = []
+        for j in range(len(evaluationlist)):
+
+            if results[j] is not None:
+                continue
+
+            starttimes[j] = time.time()
+
             callParameters = ["ugsubmit", str(self.threadcount)]
 
             callParameters += self.ugsubmitparameters
@@ -134,57 +155,42 @@ class ClusterEvaluator(Evaluator):
 
             self.id += 1
 
-            # submit the job and parse the received id
-            cluster_logger.debug(f"Starting process {j} with command: {callParameters}")
-            process = subprocess.Popen(callParameters, stdout=subprocess.PIPE)
-            proc_id = process.pid
-            process.wait()
-
-            cluster_logger.debug(f"Job id with process.pid: {proc_id}")
-
-            for line in io.TextIOWrapper(process.stdout, encoding="UTF-8"):
-                if line.startswith("Received job id"):
-                    try:
-                        self.jobids[j] = int(line.split(" ")[3])
-                        cluster_logger.debug(f"Job id from ugsubmit: {self.jobids[j]}")
-                    except ValueError:
-                        cluster_logger.warning("Error parsing job id!")
-                        cluster_logger.debug(f"direct process id from 'process.pid': {process.pid}")
-                        cluster_logger.debug(f"line from process.stdout: {line} ")
-                        cluster_logger.warning("Tmp-Fix: taking direct process id as job id\n")
-                        self.jobids[j] = proc_id
-
-
-            if self.jobids[j] is None:
-                cluster_logger.warning("Job id from ugsubmit is None! Taking direct process id as job id")
-                self.jobids[j] = proc_id
-
-            # to avoid bugs with the used scheduler on cesari
-            time.sleep(1)
-
+            submissions.append((j, callParameters))
+
+        # submit the jobs and store the received ids
+        if self.submissionthreads > 1:
+            with ThreadPoolExecutor(max_workers=self.submissionthreads) as executor:
+                jobids = executor.map(self.submitJob, *zip(*submissions))
+                for (j, _), jobid in zip(submissions, jobids):
+                    self.jobids[j] = jobid
+        else:
+            for j, callParameters in submissions:
+                self.jobids[j] = self.submitJob(j, callParameters)
+
+                # to avoid bugs with the used scheduler on cesari
+                time.sleep(1)
+
+        # wait until all jobs are finished. poll often at first, as short jobs are common,
+        # then back off to the default interval of 30 seconds
+        jobids = set(self.jobids)
+        polls = 0
+        failedpolls = 0
         while True:
 
-            # wait until all jobs are finished
-            # for this, call uginfo and parse the output
-            process = subprocess.Popen(["uginfo"], stdout=subprocess.PIPE)
-            process.wait()
-            lines = io.TextIOWrapper(process.stdout, encoding="UTF-8").readlines()
-            while True:
-                if "JOBID" not in lines[0]:
-                    lines.remove(lines[0])
-                else:
-                    break
-
-            reader = csv.DictReader(lines, delimiter=" ", skipinitialspace=True)
-
             # are all of our jobs finished?
-            finished = True
-
-            cluster_logger.debug(f"TMP: iteration over uginfo output; lines: {lines}")
+            jobstates = self.getJobStates()
+            finished = jobstates is not None
+
+            if jobstates is None:
+                failedpolls += 1
+                if failedpolls >= self.maxfailedpolls:
+                    cluster_logger.error(f"uginfo failed {failedpolls} times in a row, giving up waiting for the jobs.")
+                    raise RuntimeError("Could not get the job states from uginfo")
+            else:
+                failedpolls = 0
 
-            for row in reader:
-                jobid = int(row["JOBID"])
-                if (jobid in self.jobids) and (row["STATE"] == "RUNNING" or row["STATE"] == "PENDING"):
+            for jobid, state in jobstates or []:
+                if jobid in jobids and (state == "RUNNING" or state == "PENDING"):
                     cluster_logger.debug(f"Job {jobid} is still running.")
                     finished = False
                     break
@@ -193,24 +199,38 @@ class ClusterEvaluator(Evaluator):
                 cluster_logger.debug("All jobs finished.")
                 break
 
-            time.sleep(30)  # default: 5
+            time.sleep(min(30, 2 * 1.5 ** polls))
+            polls += 1
 
         cluster_logger.debug(f"TMP: iteration over evaluationlist; evaluationlist: {evaluationlist}")
         cluster_logger.debug(f"TMP: iteration over evaluationlist: len(evaluationlist): {len(evaluationlist)}")
 
         # now we can parse the measurement files
-        for i in range(len(evaluationlist)):
+        toparse = [i for i in range(len(evaluationlist)) if results[i] is None]
+        parseargs = [(self.evaluation_type, self.directory, evaluationids[i], beta[i], time.time() - starttimes[i])
+                     for i in toparse]
 
-            if results[i] is not None:
-                continue
+        # for few files, starting the processes costs more than it saves
+        if self.parsingprocesses > 1 and len(toparse) > 2:
+            with ProcessPoolExecutor(max_workers=self.parsingprocesses,
+                                     initializer=setup_logger.setupWorkerLogging,
+                                     initargs=(setup_logger.logfileconfigured,)) as executor:
+                parsed = list(executor.map(_parseEvaluation, *zip(*parseargs)))
+        else:
+            parsed = [_parseEvaluation(*args) for args in parseargs]
 
-            # parse the result
-            data = self.evaluation_type.parse(self.directory, evaluationids[i], beta[i], time.time() - starttimes[i])
+        for i, data in zip(toparse, parsed):
 
             # preserve the association between the ugoutput and th einternal avaluation id.
             # this allows for better debugging
             stdoutfile = os.path.join(self.directory, str(evaluationids[i]) + "_ug_output.txt")
-            copyfile("jobid." + str(self.jobids[i]) + "/job.output", stdoutfile)
+            joboutputfile = "jobid." + str(self.jobids[i]) + "/job.output"
+            try:
+                # a hardlink avoids copying the (possibly large) output
+                os.link(joboutputfile, stdoutfile)
+            except OSError:
+                # e.g. different file systems, or the file system does not support hardlinks
+                copyfile(joboutputfile, stdoutfile)
 
             results[i] = data
 
@@ -219,6 +239,73 @@ class ClusterEvaluator(Evaluator):
 
         return results
 
+    def submitJob(self, j, callParameters):
+        """Submits one job using ugsubmit and parses the received job id.
+
+        :param j: index of the job in the current evaluation, used for logging
+        :type j: int
+        :param callParameters: command line to call
+        :type callParameters: list of strings
+        :return: the job id, or the process id of ugsubmit if the job id could not be parsed
+        :rtype: int
+        """
+        cluster_logger.debug(f"Starting process {j} with command: {callParameters}")
+        # communicate() reads the output while waiting, so a full pipe can not block ugsubmit
+        process = subprocess.Popen(callParameters, stdout=subprocess.PIPE, encoding="UTF-8")
+        proc_id = process.pid
+        output, _ = process.communicate()
+
+        cluster_logger.debug(f"Job id with process.pid: {proc_id}")
+
+        jobid = None
+        for line in output.splitlines():
+            if line.startswith("Received job id"):
+                try:
+                    jobid = int(line.split(" ")[3])
+                    cluster_logger.debug(f"Job id from ugsubmit: {jobid}")
+                except ValueError:
+                    cluster_logger.warning("Error parsing job id!")
+                    cluster_logger.debug(f"direct process id from 'process.pid': {process.pid}")
+                    cluster_logger.debug(f"line from process.stdout: {line} ")
+                    cluster_logger.warning("Tmp-Fix: taking direct process id as job id\n")
+                    jobid = proc_id
+
+        if jobid is None:
+            cluster_logger.warning("Job id from ugsubmit is None! Taking direct process id as job id")
+            jobid = proc_id
+
+        return jobid
+
+    def getJobStates(self):
+        """Calls uginfo and returns the id and state of every job listed.
+        The lines are only split when iterating, so callers stopping early skip the remaining lines.
+
+        :return: iterator of (job id, state) tuples, or None if the output of uginfo could not be parsed
+        :rtype: iterator of tuples
+        """
+        process = subprocess.run(["uginfo"], capture_output=True, encoding="UTF-8")
+        if process.returncode != 0:
+            cluster_logger.warning(f"uginfo failed with return code {process.returncode}: {process.stderr.strip()}")
+        lines = iter(process.stdout.splitlines())
+
+        # skip everything up to the header, and find the columns of interest in it
+        for line in lines:
+            if "JOBID" in line:
+                header = line.split()
+                break
+        else:
+            cluster_logger.warning("No header found in uginfo output!")
+            return None
+
+        jobcolumn = header.index("JOBID")
+        statecolumn = header.index("STATE")
+
+        lastcolumn = max(jobcolumn, statecolumn)
+
+        return ((int(columns[jobcolumn]), columns[statecolumn])
+                for columns in map(str.split, lines)
+                if len(columns) > lastcolumn)
+
     def __enter__(self):
         pass
 
@@ -235,24 +322,20 @@ class ClusterEvaluator(Evaluator):
             return None
 
         # call uginfo to find out which jobs are still running
-        process = subprocess.Popen(["uginfo"], stdout=subprocess.PIPE)
-        process.wait()
-        lines = io.TextIOWrapper(process.stdout, encoding="UTF-8").readlines()
-        while True:
-            if "JOBID" not in lines[0]:
-                lines.remove(lines[0])
-            else:
-                break
-
-        reader = csv.DictReader(lines, delimiter=" ", skipinitialspace=True)
+        jobstates = self.getJobStates()
 
-        cluster_logger.debug(f"TMP: iteration over reader in exit; lines: {lines}")
-        for row in reader:
-            jobid = int(row["JOBID"])
-            if jobid in self.jobids:
+        jobids = set(self.jobids)
+        cancellations = []
+        for jobid, _ in jobstates or []:
+            if jobid in jobids:
                 print("Cancelling " + str(jobid))
                 cluster_logger.info(f"Cancelling job {jobid} in exit function")
 
-                # cancel them using ugcancel
-                process2 = subprocess.Popen(["ugcancel", str(jobid)], stdout=subprocess.PIPE)
-                process2.wait()
+                # cancel them using ugcancel. ugcancel takes a single job id, so start all
+                # calls at once instead of waiting for each one
+                cancellations.append(subprocess.Popen(["ugcancel", str(jobid)],
+                                                      stdout=subprocess.DEVNULL,
+                                                      stderr=subprocess.DEVNULL))
+
+        for process in cancellations:
+            process.wait()
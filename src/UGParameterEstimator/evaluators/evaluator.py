@@ -1,6 +1,9 @@
 import numpy as np
 import math
 import os
+import pickle
+import hashlib
+import threading
 from abc import ABC, abstractmethod
 from UGParameterEstimator import ParameterManager, Evaluation, ParameterOutputAdapter, ErroredEvaluation, setup_logger
 
@@ -18,7 +21,15 @@ class Evaluator(ABC):
     total_evaluation_count = 0
     serial_evaluation_count = 0
     cached_evaluation_count = 0
-    cache = set()
+    cache = {}
+
+    # guards the statistics, so evaluations can be handled from multiple threads.
+    # the inserts into and lookups in the cache dict are atomic by themselves
+    _lock = threading.RLock()
+
+    # directory to store evaluations in across runs, see setCacheDirectory
+    cachedirectory = None
+    _cachecontext = None
 
     @property
     @abstractmethod
@@ -31,7 +42,7 @@ class Evaluator(ABC):
         pass
 
     @abstractmethod
-    def evaluate(self, evaluationlist, transform=True, tag=""):
+    def evaluate(self, evaluationlist, transform=True, tag="", check_cache=True):
         """Evaluates the parameters given in evaluationlist using UG4, and the adapters set in the constructor.
 
         :param evaluationlist: parametersets to evaluate
@@ -40,11 +51,29 @@ class Evaluator(ABC):
         :type transform: boolean, optional
         :param tag: tag-string attached to all produced evaluations for analysis purposes
         :type tag: string
+        :param check_cache: wether to look up the parameters in the cache first, for all or per parameterset,
+                defaults to true. Parametersets known to be new (e.g. finite differencing steps) can skip it.
+        :type check_cache: boolean or list of booleans, optional
         :return: list of parsed evaluation objects with the type given in the constructor, or ErroredEvaluation
         :rtype: list of Evaluation
         """
         pass
 
+    @staticmethod
+    def getCacheChecks(check_cache, count):
+        """Expands the check_cache argument of evaluate to one boolean per parameterset.
+
+        :param check_cache: check_cache argument of evaluate
+        :type check_cache: boolean or list of booleans
+        :param count: number of parametersets
+        :type count: int
+        :return: wether to check the cache, for every parameterset
+        :rtype: list of booleans
+        """
+        if isinstance(check_cache, bool):
+            return [check_cache] * count
+        return list(check_cache)
+
     def setResultObject(self, res):
         """Sets the result object to write statistics to.
 
@@ -62,9 +91,21 @@ class Evaluator(ABC):
         :param tag: tag to store the evaluations under in the result object
         :type tag: string
         """
-        self.cache.update(evaluations)
-        self.serial_evaluation_count += 1
-        self.total_evaluation_count += len(evaluations)
+        for evaluation in evaluations:
+            # evaluations without parameters can never be served from the cache, and evaluations
+            # served from the cache (the cluster evaluator passes them here too) are already stored
+            if evaluation is None or evaluation.parameters is None:
+                continue
+            key = evaluation.parametersKey
+            if self.cache.get(key) is evaluation:
+                continue
+
+            self.cache[key] = evaluation
+            if self.cachedirectory is not None and not isinstance(evaluation, ErroredEvaluation):
+                self.storeEvaluation(evaluation)
+        with self._lock:
+            self.serial_evaluation_count += 1
+            self.total_evaluation_count += len(evaluations)
         if self.resultobj is not None:
             self.resultobj.addEvaluations(evaluations, tag)
             self.resultobj.addRunMetadata("evaluator_totalcount", self.total_evaluation_count)
@@ -80,20 +121,103 @@ class Evaluator(ABC):
         :return: Evaluation, if in cache, or None
         :rtype: Evaluation
         """
-        for evaluation in self.cache:
-            if evaluation.parameters is None:
-                continue
-            if np.array_equal(evaluation.parameters, parameters):
-                if self.resultobj is not None:
-                    self.resultobj.log("Served evaluation " + str(evaluation.eval_id) + " from cache!")
-                self.cached_evaluation_count += 1
-                return evaluation
-        return None
+        # the cache is keyed by the parameters, so this is a single lookup
+        key = Evaluation.parameterKey(parameters)
+        evaluation = self.cache.get(key)
+        if evaluation is None and self.cachedirectory is not None:
+            evaluation = self.loadEvaluation(parameters)
+        # comparing the keys of both is a plain bytes comparison
+        if evaluation is None or evaluation.parametersKey != key:
+            return None
+
+        if self.resultobj is not None:
+            self.resultobj.log("Served evaluation " + str(evaluation.eval_id) + " from cache!")
+        with self._lock:
+            self.cached_evaluation_count += 1
+        return evaluation
+
+    def setCacheDirectory(self, directory):
+        """Sets a directory to store all evaluations in, so they are served from the cache
+        in later runs too. The evaluations are stored per luafile (by its content), evaluation
+        type, fixed parameters, command line parameters and parameter output adapter type.
+        Changes to anything else influencing the results (e.g. files included by the luafile)
+        are not detected, in this case the directory has to be cleared.
+
+        :param directory: directory to store the evaluations in, or None to disable storing them
+        :type directory: string
+        """
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self.cachedirectory = directory
+        self._cachecontext = None
+
+    def getCacheFilename(self, parameters):
+        """Returns the file an evaluation of the given parameters is stored in, in the cache directory.
+
+        :param parameters: parameters of the evaluation
+        :type parameters: numpy array
+        :return: path of the cache file
+        :rtype: string
+        """
+        if self._cachecontext is None:
+            context = hashlib.blake2b(digest_size=16)
+            # the evaluators store the luafile as luafile (local) or luafilename (cluster)
+            luafile = getattr(self, "luafile", None) or getattr(self, "luafilename", None)
+            if luafile is not None and os.path.isfile(luafile):
+                with open(luafile, "rb") as f:
+                    context.update(f.read())
+            context.update(repr(getattr(self, "evaluation_type", None)).encode())
+            context.update(repr(sorted(getattr(self, "fixedparameters", {}).items())).encode())
+            context.update(repr(list(getattr(self, "cliparameters", []))).encode())
+            context.update(type(getattr(self, "parameter_output_adapter", None)).__name__.encode())
+            self._cachecontext = context
+
+        shape, data = Evaluation.parameterKey(parameters)
+        key = self._cachecontext.copy()
+        key.update(repr(shape).encode())
+        key.update(data)
+        return os.path.join(self.cachedirectory, key.hexdigest() + ".pkl")
+
+    def storeEvaluation(self, evaluation):
+        """Stores the evaluation in the cache directory.
+
+        :param evaluation: evaluation to store
+        :type evaluation: Evaluation
+        """
+        filename = self.getCacheFilename(evaluation.parameters)
+        try:
+            # write to a temporary file first, so no partially written file is ever read
+            with open(filename + ".tmp", "wb") as f:
+                pickle.dump(evaluation, f)
+            os.replace(filename + ".tmp", filename)
+        except (OSError, pickle.PicklingError):
+            evaluator_logger.warning(f"Could not store evaluation in cache file {filename}")
+
+    def loadEvaluation(self, parameters):
+        """Loads the evaluation of the given parameters from the cache directory, if stored there.
+
+        :param parameters: parameters of the evaluation
+        :type parameters: numpy array
+        :return: the stored evaluation, or None
+        :rtype: Evaluation
+        """
+        filename = self.getCacheFilename(parameters)
+        if not os.path.isfile(filename):
+            return None
+        try:
+            with open(filename, "rb") as f:
+                evaluation = pickle.load(f)
+        except Exception:
+            evaluator_logger.warning(f"Could not read cache file {filename}")
+            return None
+
+        self.cache[evaluation.parametersKey] = evaluation
+        return evaluation
 
     def reset(self):
         """resets the internal cache and statistics
         """
-        self.cache = set()
+        self.cache = {}
         self.cached_evaluation_count = 0
         self.serial_evaluation_count = 0
         self.total_evaluation_count = 0
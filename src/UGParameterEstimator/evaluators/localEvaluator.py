@@ -3,6 +3,8 @@ import numpy as np
 import os
 import os.path
 import time
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 from UGParameterEstimator import ParameterManager, Evaluation, ParameterOutputAdapter, ErroredEvaluation
 from .evaluator import Evaluator
 
@@ -15,7 +17,7 @@ class LocalEvaluator(Evaluator):
     Output of UG4 is redirected into a separate <id>_ug_output.txt file.
 
     """
-    def __init__(self, luafile, directory, parametermanager: ParameterManager, evaluation_type: Evaluation, parameter_output_adapter: ParameterOutputAdapter, fixedparameters={}, threadcount=10, cliparameters=[], weight=[]):
+    def __init__(self, luafile, directory, parametermanager: ParameterManager, evaluation_type: Evaluation, parameter_output_adapter: ParameterOutputAdapter, fixedparameters={}, threadcount=10, cliparameters=[], weight=[], parallelevaluations=1):
         """Class constructor
 
         :param luafilename: path to the luafile to call for every evaluation
@@ -36,6 +38,9 @@ class LocalEvaluator(Evaluator):
                 for places that would normally require a space.
         :param weight: list of weights for each parameter
         :type cliparameters: list of strings, optional
+        :param parallelevaluations: number of evaluations run at the same time, defaults to 1.
+                Every evaluation uses threadcount processes, so choose both to fit the number of cores.
+        :type parallelevaluations: int, optional
         """
         self.directory = directory
         self.parametermanager = parametermanager
@@ -49,24 +54,30 @@ class LocalEvaluator(Evaluator):
         self.threadcount = threadcount
         self.cliparameters = cliparameters
         self.weight = weight
+        self.parallelevaluations = parallelevaluations
 
-        if not os.path.exists(self.directory):
-            os.mkdir(self.directory)
+        # start with an empty exchange directory, including subdirectories left over
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
 
-        filelist = [f for f in os.listdir(self.directory)]
-        for f in filelist:
-            os.remove(os.path.join(self.directory, f))
+        # the paths and the command are the same for every evaluation, only the id differs
+        self.absolute_directory_path = os.getcwd() + "/" + self.directory
+        self.absolute_script_path = os.getcwd() + "/" + self.luafile
+        if (self.threadcount > 1):
+            self.callprefix = ["mpirun", "-np", str(self.threadcount), "ugshell", "-ex", self.absolute_script_path]
+        else:
+            self.callprefix = ["ugshell", "-ex", self.absolute_script_path]
 
     @property
     def parallelism(self):
-        """Returns the parallelism of the evaluator. here it is one, as only one evaluation is handled in parallel.
+        """Returns the parallelism of the evaluator, i.e. the number of evaluations handled in parallel.
 
         :return: parallelism of the evaluator
         :rtype:  int
         """
-        return 1
+        return self.parallelevaluations
 
-    def evaluate(self, evaluationlist, transform=True, tag=""):
+    def evaluate(self, evaluationlist, transform=True, tag="", check_cache=True):
         """Evaluates the parameters given in evaluationlist using UG4, and the adapters set in the constructor.
 
         :param evaluationlist: parametersets to evaluate
@@ -75,71 +86,159 @@ class LocalEvaluator(Evaluator):
         :type transform: boolean, optional
         :param tag: tag-string attached to all produced evaluations for analysis purposes
         :type tag: string
+        :param check_cache: wether to look up the parameters in the cache first, for all or per parameterset,
+                defaults to true. Parametersets known to be new (e.g. finite differencing steps) can skip it.
+        :type check_cache: boolean or list of booleans, optional
         :return: list of parsed evaluation objects with the type given in the constructor, or ErroredEvaluation
         :rtype: list of Evaluation
         """
-        results = []
+        results = [None] * len(evaluationlist)
+        pending = []
+        cachechecks = self.getCacheChecks(check_cache, len(evaluationlist))
 
-        for beta in evaluationlist:
+        # parameters occuring more than once in the list are only evaluated once
+        duplicates = {}
+        pendingkeys = {}
+
+        for j, beta in enumerate(evaluationlist):
 
             if transform is True:
                 parameters = self.parametermanager.getTransformedParameters(beta)
                 if parameters is None:
-                    results.append(ErroredEvaluation(None, reason="Infeasible parameters"))
+                    results[j] = ErroredEvaluation(None, reason="Infeasible parameters")
                     continue
             else:
                 parameters = beta
 
-            res = self.checkCache(parameters)
+            res = self.checkCache(parameters) if cachechecks[j] else None
 
             if res is not None:
-                results.append(res)
+                results[j] = res
+                continue
+
+            key = Evaluation.parameterKey(parameters)
+            if key in pendingkeys:
+                duplicates[j] = (pendingkeys[key], parameters)
                 continue
+            pendingkeys[key] = j
+
+            pending.append((j, parameters))
+
+        if not pending:
+            return results
+
+        if not os.path.isfile(self.absolute_script_path):
+            print("Luafile not found! " + self.absolute_script_path)
+            exit()
+        if not os.path.exists(self.absolute_directory_path):
+            print("Exchange directory not found! " + self.absolute_directory_path)
+            exit()
+
+        jobs = []
+        for _, parameters in pending:
+            jobs.append((self.id, parameters))
+            self.id += 1
 
-            starttime = time.time()
+        # run the evaluations, one after another or in parallel threads, as the work is done by UG4
+        if self.parallelevaluations > 1:
+            with ThreadPoolExecutor(max_workers=self.parallelevaluations) as executor:
+                evaluations = list(executor.map(self.runEvaluation, *zip(*jobs)))
+        else:
+            evaluations = self.runEvaluationsPipelined(jobs)
 
-            absolute_directory_path = os.getcwd() + "/" + self.directory
-            absolute_script_path = os.getcwd() + "/" + self.luafile
+        newevaluations = []
+        for (j, parameters), (data, runtime) in zip(pending, evaluations):
 
-            if not os.path.isfile(absolute_script_path):
-                print("Luafile not found! " + absolute_script_path)
-                exit()
-            if not os.path.exists(absolute_directory_path):
-                print("Exchange directory not found! " + absolute_directory_path)
-                exit()
+            if data is None:
+                results[j] = ErroredEvaluation(parameters, reason="Error while parsing.")
+                continue
 
-            if (self.threadcount > 1):
-                callParameters = ["mpirun", "-np", str(self.threadcount), "ugshell", "-ex", absolute_script_path, "-evaluationId", str(self.id), "-communicationDir", absolute_directory_path]
+            self.totalevaluationtime += runtime
+            if self.parallelevaluations > 1:
+                newevaluations.append(data)
             else:
-                callParameters = ["ugshell", "-ex", absolute_script_path, "-evaluationId", str(self.id), "-communicationDir", absolute_directory_path]
+                self.handleNewEvaluations([data], tag)
 
-            callParameters += self.cliparameters
+            results[j] = data
 
-            # assemble the paths
-            stdoutfile = os.path.join(self.directory, str(self.id) + "_ug_output.txt")
+        if newevaluations:
+            self.handleNewEvaluations(newevaluations, tag)
 
-            # output the parameters however needed for the application
-            self.parameter_output_adapter.writeParameters(self.directory, self.id, self.parametermanager, parameters, self.fixedparameters)
+        for j, (first, parameters) in duplicates.items():
+            results[j] = self.checkCache(parameters) or results[first]
 
-            # call!
-            with open(stdoutfile, "w") as outfile:
-                subprocess.call(callParameters, stdout=outfile)
+        return results
 
-            # parse the data, using the provided evaluation type
-            data = self.evaluation_type.parse(self.directory, self.id, parameters, time.time() - starttime)
+    def startEvaluation(self, evaluation_id):
+        """Starts UG4 for one evaluation, without waiting for it. The parameters have to be written before.
 
-            self.id += 1
+        :param evaluation_id: id of the evaluation
+        :type evaluation_id: int
+        :return: the started process
+        :rtype: subprocess.Popen
+        """
+        callParameters = self.callprefix + ["-evaluationId", str(evaluation_id), "-communicationDir", self.absolute_directory_path] + self.cliparameters
 
-            if data is None:
-                results.append(ErroredEvaluation(parameters, reason="Error while parsing."))
-                continue
+        # assemble the paths
+        stdoutfile = os.path.join(self.directory, str(evaluation_id) + "_ug_output.txt")
 
-            self.totalevaluationtime += time.time() - starttime
-            self.handleNewEvaluations([data], tag)
+        # call! the process keeps its own handle of the output file
+        with open(stdoutfile, "w") as outfile:
+            return subprocess.Popen(callParameters, stdout=outfile)
 
-            results.append(data)
+    def runEvaluation(self, evaluation_id, parameters):
+        """Runs UG4 for one set of parameters and parses the result.
 
-        return results
+        :param evaluation_id: id of the evaluation
+        :type evaluation_id: int
+        :param parameters: (transformed) parameters to evaluate
+        :type parameters: numpy array
+        :return: parsed evaluation (None if it could not be parsed) and the time taken, in seconds
+        :rtype: tuple (Evaluation, float)
+        """
+        starttime = time.time()
+
+        # output the parameters however needed for the application
+        self.parameter_output_adapter.writeParameters(self.directory, evaluation_id, self.parametermanager, parameters, self.fixedparameters)
+
+        self.startEvaluation(evaluation_id).wait()
+
+        # parse the data, using the provided evaluation type
+        data = self.evaluation_type.parse(self.directory, evaluation_id, parameters, time.time() - starttime)
+
+        return data, time.time() - starttime
+
+    def runEvaluationsPipelined(self, jobs):
+        """Runs the evaluations one after another, like runEvaluation. While UG4 is running, the
+        parameters of the next evaluation are written, and the next run is started before
+        the result of the current one is parsed.
+
+        :param jobs: evaluation id and parameters of every evaluation
+        :type jobs: list of tuples
+        :return: parsed evaluation (None if it could not be parsed) and the time taken, in seconds, for every job
+        :rtype: generator of tuples (Evaluation, float)
+        """
+        for k, (evaluation_id, parameters) in enumerate(jobs):
+            if k == 0:
+                self.parameter_output_adapter.writeParameters(self.directory, evaluation_id, self.parametermanager, parameters, self.fixedparameters)
+                starttime = time.time()
+                process = self.startEvaluation(evaluation_id)
+
+            nextjob = jobs[k + 1] if k + 1 < len(jobs) else None
+            if nextjob is not None:
+                self.parameter_output_adapter.writeParameters(self.directory, nextjob[0], self.parametermanager, nextjob[1], self.fixedparameters)
+
+            process.wait()
+            runtime = time.time() - starttime
+
+            if nextjob is not None:
+                starttime = time.time()
+                process = self.startEvaluation(nextjob[0])
+
+            # parse the data, using the provided evaluation type
+            data = self.evaluation_type.parse(self.directory, evaluation_id, parameters, runtime)
+
+            yield data, runtime
 
     def __enter__(self):
         pass
@@ -1,7 +1,7 @@
 import numpy as np
 import math
 from abc import ABC, abstractmethod
-from UGParameterEstimator import ErroredEvaluation, setup_logger
+from UGParameterEstimator import Evaluation, ErroredEvaluation, setup_logger
 
 lineSearch_logger = setup_logger.logger.getChild("lineSearch")
 
@@ -10,6 +10,9 @@ class LineSearch(ABC):
     providing a helper function
     """
 
+    # number of threads converting evaluations to numpy arrays, see Evaluation.getNumpyArraysLike
+    conversionthreads = 1
+
     def __init__(self, evaluator):
         """Class constructor setting the evaluator to use
 
@@ -32,14 +35,7 @@ class LineSearch(ABC):
         :return: the results of the covnertions
         :rtype: list of numpy arrays
         """
-
-        results = []
-        for e in evaluations:
-            if e is None or isinstance(e, ErroredEvaluation):
-                results.append(None)
-            else:
-                results.append(e.getNumpyArrayLike(target))
-        return results
+        return Evaluation.getNumpyArraysLike(evaluations, target, self.conversionthreads)
 
     @abstractmethod
     def doLineSearch(self, stepdirection, guess, target, J, r, result):
@@ -6,12 +6,19 @@ import skopt
 
 class BayesOptimizer(Optimizer):
 
-    def __init__(self, parametermanager: ParameterManager, epsilon=1e-4, minreduction=1e-4, max_iterations=20):
+    def __init__(self, parametermanager: ParameterManager, epsilon=1e-4, minreduction=1e-4, max_iterations=20, base_estimator="GP", acq_optimizer="auto", ask_strategy="cl_min"):
         super().__init__(epsilon, Optimizer.Differencing.forward)
         self.parametermanager = parametermanager
         self.minreduction = minreduction
         self.max_iterations = max_iterations
 
+        # options passed on to skopt. fitting the gaussian process dominates the runtime for many
+        # iterations, cheaper surrogates ("ET", "RF", "GBRT") or acq_optimizer="sampling" trade
+        # accuracy of the model for speed. ask_strategy is one of "cl_min", "cl_mean", "cl_max"
+        self.base_estimator = base_estimator
+        self.acq_optimizer = acq_optimizer
+        self.ask_strategy = ask_strategy
+
     def run(self, evaluator, initial_parameters, target, result = Result()):
 
         evaluator.resultobj = result    
@@ -44,15 +51,16 @@ class BayesOptimizer(Optimizer):
 
         bayes_optimizer = skopt.Optimizer(
             dimensions,
-            base_estimator="GP",
+            base_estimator=self.base_estimator,
             n_initial_points=2,
             acq_func="EI",
+            acq_optimizer=self.acq_optimizer,
             random_state=1
         )
 
         for iteration in range(self.max_iterations):
 
-            needed_evaluations = bayes_optimizer.ask(evaluator.parallelism)
+            needed_evaluations = bayes_optimizer.ask(evaluator.parallelism, strategy=self.ask_strategy)
 
             result_evaluations = evaluator.evaluate(needed_evaluations, "bayes-opt")
 
@@ -64,25 +72,18 @@ class BayesOptimizer(Optimizer):
                     result.log(evaluator.getStatistics())
                     return
 
-            Y = []
-
-            min_S = None
-            min_Index = None
-
-            for i in range(len(results)):
-
-                residual = results[i] - targetdata
-                S = 0.5*residual.dot(residual)
-
-                if min_S is None or min_S > S:
-                    min_S = S
-                    min_Index = i
+            # compute the residual norms of all points at once
+            # vstack copies, so the residuals can be formed in place
+            R = np.vstack(results)
+            R -= targetdata
+            Y = 0.5*np.einsum("ij,ij->i", R, R)
 
-                Y.append(S)
+            min_Index = int(Y.argmin())
+            min_S = Y[min_Index]
 
-            print(Y)
+            print(Y.tolist())
 
-            bayes_optimizer.tell(needed_evaluations, Y)
+            bayes_optimizer.tell(needed_evaluations, Y.tolist())
             
             result.addMetric("residualnorm", min_S)
             result.addMetric("parameters", needed_evaluations[min_Index])
@@ -12,23 +12,35 @@ class GainedLevMarOptimizer(Optimizer):
         self.presteps = presteps
         self.initial_lam = initial_lam
 
-    def calculateDelta(self, V, r, p, lam):
-
-        # calculate Lev-Mar step direction  (p.7)
-        A = V.transpose().dot(V)
-        g = V.transpose().dot(r)
-                
-        M = A + lam*np.diag(np.ones(p))
-        Q, R = np.linalg.qr(M)
-        w = Q.transpose().dot(g)
-        delta = -np.linalg.solve(R, w)
-        return delta
-
-    def calculateGainRatio(self, S, newS, delta, lam, grad):
-        denum = 0.5*delta.transpose().dot(lam*delta-grad)
-        num = S-newS
-
-        return num/denum
+    def decomposeNormalMatrix(self, A, g):
+        """Decomposes the normal matrix once per iteration for the sweep over the presteps lambdas.
+        A = V^T V does not depend on lambda: with A = U diag(w) U^T, every damped system
+        (A + lam*I) delta = -g is solved by delta = -U diag(1/(w+lam)) U^T g.
+
+        :param A: the normal matrix V^T V
+        :type A: numpy array, 2d
+        :param g: the gradient V^T r
+        :type g: numpy array
+        :return: eigenvalues w, eigenvectors U and the transformed gradient U^T g
+        :rtype: tuple (numpy array, numpy array, numpy array)
+        """
+        w, U = np.linalg.eigh(A)
+        return w, U, U.transpose().dot(g)
+
+    def calculateDeltasFromDecomposition(self, decomposition, lambdas):
+        """Calculates the Levenberg-Marquardt step (p.7) for every lambda of the sweep from the
+        decomposition of the normal matrix. Only O(p^2) per lambda, and all in one matrix product.
+
+        :param decomposition: result of decomposeNormalMatrix
+        :type decomposition: tuple
+        :param lambdas: the dampings to calculate the steps for
+        :type lambdas: list of floats
+        :return: one step per row, in the order of lambdas
+        :rtype: numpy array, 2d
+        """
+        w, U, h = decomposition
+        deltas = -(h/(w + np.asarray(lambdas)[:, None])).dot(U.transpose())
+        return deltas
 
     def run(self, evaluator, initial_parameters, target, result = Result()):
 
@@ -48,6 +60,11 @@ class GainedLevMarOptimizer(Optimizer):
 
         targetdata = target.getNumpyArray()
 
+        # the sizes are the same in every iteration
+        n = len(targetdata)
+        p = len(guess)
+        dof = n-p
+
         first_S = -1
         lam = -1
         nu = 2
@@ -68,18 +85,17 @@ class GainedLevMarOptimizer(Optimizer):
 
             S = 0.5*r.dot(r)
 
+            # the normal matrix and the gradient are used for the initial lambda, the steps and the gain ratios
+            A = V.transpose().dot(V)
+            g = V.transpose().dot(r)
+
             # save the residualnorm S for calculation of the relative reduction
             if i == 0:
                 first_S = S
-                H = V.transpose().dot(V)
-                lam = self.tau * np.max(np.diag(H))
+                lam = self.tau * np.max(np.diag(A))
                 if self.initial_lam is not None:
                     lam = self.initial_lam
 
-            n = len(targetdata)
-            p = len(guess)
-            dof = n-p
-
             # calculate s^2 = residual mean square / variance estimate (p.6 Bates/Watts)
 
             variance = None if dof == 0 else S/dof
@@ -100,26 +116,37 @@ class GainedLevMarOptimizer(Optimizer):
                 result.commitIteration()
                 break
 
+            decomposition = self.decomposeNormalMatrix(A, g)
+
             lambdas = [lam]
             nus = [nu]
-            deltas = [self.calculateDelta(V, r, p, lam)]
-            points = [guess + deltas[-1]]
 
             for z in range(self.presteps):
                 new_nu = nus[-1]*2
                 nus.append(new_nu)
                 new_lam = lambdas[-1]*nus[-1]
                 lambdas.append(new_lam)
-                deltas.append(self.calculateDelta(V, r, p, new_lam))
-                points.append(guess + deltas[-1])
+
+            D = self.calculateDeltasFromDecomposition(decomposition, lambdas)
+            points = list(guess + D)
 
             evals = evaluator.evaluate(points)
             evalvecs = self.measurementToNumpyArrayConverter(evals, target)
 
-            g = V.transpose().dot(r)
-
-            costs = [None if x is None else 0.5*(x-targetdata).dot(x-targetdata) for x in evalvecs]
-            gainratios = [self.calculateGainRatio(S, costs[i], deltas[i], lambdas[i], g) for i in range(self.presteps+1)]
+            # compute the costs and gain ratios of all valid candidates at once.
+            # errored evaluations keep nan, so their steps are never accepted
+            costs = np.full(self.presteps+1, np.nan)
+            gainratios = np.full(self.presteps+1, np.nan)
+            valid = [z for z, x in enumerate(evalvecs) if x is not None]
+            if valid:
+                # vstack copies, so the residuals can be formed in place
+                R = np.vstack([evalvecs[z] for z in valid])
+                R -= targetdata
+                costs[valid] = 0.5*np.einsum("ij,ij->i", R, R)
+
+                DValid = D[valid]
+                denums = 0.5*np.einsum("ij,ij->i", DValid, np.array(lambdas)[valid, None]*DValid - g)
+                gainratios[valid] = (S - costs[valid])/denums
 
             for z in range(self.presteps+1):
                 if isinstance(evals[z], ErroredEvaluation):
@@ -128,20 +155,21 @@ class GainedLevMarOptimizer(Optimizer):
                     result.log("\t lam=" + str(lambdas[z]) + ", nu=" + str(nus[z]) + ": f=" + str(costs[z]) + ", new gainration=" + str(gainratios[z]))
 
 
-            for z in range(self.presteps+1):
-                if gainratios[z] > 0:   # step acceptable
-                    new_S = costs[z]
-                    nu = 2
-                    lam = lambdas[z]*max(1/3, 1-(2*gainratios[z]-1)**3)
-                    nextguess = points[z]
-                    break
-            else:
+            # take the first acceptable step
+            acceptable = np.flatnonzero(gainratios > 0)
+            if len(acceptable) == 0:
                 result.log("-- Gained Levenberg-Marquardt method did not converge. Increase presteps. --")
                 result.commitIteration()
                 result.log(evaluator.getStatistics())
                 result.save()
                 return result
 
+            z = acceptable[0]
+            new_S = costs[z]
+            nu = 2
+            lam = lambdas[z]*max(1/3, 1-(2*gainratios[z]-1)**3)
+            nextguess = points[z]
+
 
             result.addMetric("lambda", lam)
             result.addMetric("nu", nu)
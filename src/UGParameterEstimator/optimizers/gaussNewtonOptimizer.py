@@ -1,16 +1,167 @@
 from .optimizer import Optimizer
-from UGParameterEstimator import LineSearch, Result, setup_logger
+from UGParameterEstimator import LineSearch, Result, ErroredEvaluation, setup_logger
 import numpy as np
 from scipy import stats
+from scipy.linalg import solve_triangular
+from scipy.linalg.lapack import dgeqrf, dormqr
 
 newtonOptimizer_logger = setup_logger.logger.getChild("gaussNewtonOptimizer")
 
 class GaussNewtonOptimizer(Optimizer):
-    def __init__(self, linesearchmethod: LineSearch, maxiterations=15, epsilon=1e-3, minreduction=1e-4, differencing=Optimizer.Differencing.forward):
+
+    # maximum number of times the damping is increased for a single damped step
+    maxdampingincreases = 20
+
+    def __init__(self, linesearchmethod: LineSearch, maxiterations=15, epsilon=1e-3, minreduction=1e-4, differencing=Optimizer.Differencing.forward, damping=None, iterationstatistics=True):
+        """Class constructor
+
+        :param linesearchmethod: linesearch done in the gauss-newton direction, unused with damping
+        :type linesearchmethod: LineSearch
+        :param damping: initial damping mu. If given, the steps solve (V^T V + mu*I) delta = -V^T r
+                instead of doing a linesearch, accepted by their gain ratio (Levenberg-Marquardt).
+                Defaults to None, i.e. plain Gauss-Newton steps.
+        :type damping: float, optional
+        :param iterationstatistics: wether to compute the covariance, correlation and standard errors in every
+                iteration, or only for the final parameters. Result.writeErrorTable needs them for every iteration.
+                Defaults to true.
+        :type iterationstatistics: boolean, optional
+        """
         super().__init__(epsilon, differencing)
         self.linesearchmethod = linesearchmethod
         self.maxiterations = maxiterations
         self.minreduction = minreduction
+        self.damping = damping
+        self.iterationstatistics = iterationstatistics
+
+    @staticmethod
+    def decomposeQR(V, r):
+        """Computes the reduced QR decomposition V = Q1 R1 and applies Q1^T to r, calling LAPACK directly.
+        Q1 is never formed: Q1^T r is applied by the householder reflectors of the decomposition.
+
+        :param V: matrix to decompose, with at least as many rows as columns
+        :type V: numpy array, 2d
+        :param r: vector to apply Q1^T to
+        :type r: numpy array
+        :raises LinAlgError: if LAPACK reports an error
+        :return: Q1^T r and the upper triangular factor R1
+        :rtype: tuple (numpy array, numpy array)
+        """
+        k = min(V.shape)
+        qr, tau, _, info = dgeqrf(V)
+        if info != 0:
+            raise np.linalg.LinAlgError("dgeqrf failed with info " + str(info))
+
+        # the minimal workspace is one entry per column of r (a single one), more allows a blocked application
+        qtr, _, info = dormqr("L", "T", qr, tau, np.reshape(r, (-1, 1)), lwork=64)
+        if info != 0:
+            raise np.linalg.LinAlgError("dormqr failed with info " + str(info))
+
+        return qtr[:k, 0], np.triu(qr[:k])
+
+    def doDampedStep(self, evaluator, guess, target, V, r, S, mu, weight_vector, result):
+        """Searches a damped step reducing the residual norm, increasing the damping until one is found.
+        If the predicted reduction of a step is negligible, the current guess is already optimal.
+
+        :param evaluator: the evaluator to use
+        :type evaluator: Evaluator
+        :param guess: the current point in parameter space
+        :type guess: numpy array
+        :param target: the target of the calibration
+        :type target: Evaluation
+        :param V: the (weighted) jacobi matrix at guess
+        :type V: numpy array
+        :param r: the (weighted) residuals at guess
+        :type r: numpy array
+        :param S: the residual norm at guess
+        :type S: float
+        :param mu: the damping to start with
+        :type mu: float
+        :param weight_vector: weight of every measurement, or None
+        :type weight_vector: numpy array
+        :param result: the result object to log to
+        :type result: Result
+        :return: the next guess (None if no step reduced the residual norm), the damping to continue with
+                and wether the current guess is optimal
+        :rtype: tuple (numpy array, float, boolean)
+        """
+        targetdata = target.getNumpyArray()
+        p = len(guess)
+        g = V.transpose().dot(r)
+
+        for _ in range(self.maxdampingincreases):
+            # (V^T V + mu*I) delta = -V^T r is the least squares problem [V; sqrt(mu)*I] delta = [-r; 0]
+            A = np.vstack([V, np.sqrt(mu) * np.eye(p)])
+            b = np.concatenate([-r, np.zeros(p)])
+            delta = np.linalg.lstsq(A, b, rcond=None)[0]
+
+            # reduction predicted by the linearization. near the optimum g and delta vanish, the
+            # gain ratio is undefined and no larger damping would find a better point
+            predictedreduction = 0.5 * delta.dot(mu * delta - g)
+            if predictedreduction <= np.finfo(np.float64).eps * S:
+                result.log("\t mu=" + str(mu) + ": predicted reduction " + str(predictedreduction) + " is negligible")
+                return None, mu, True
+
+            evaluation = evaluator.evaluate([guess + delta], True, "damped-step")[0]
+            if isinstance(evaluation, ErroredEvaluation):
+                result.log("\t mu=" + str(mu) + ": " + evaluation.reason)
+                mu *= 2
+                continue
+
+            new_r = evaluation.getNumpyArrayLike(target) - targetdata
+            if weight_vector is not None:
+                new_r *= weight_vector
+            new_S = 0.5 * new_r.dot(new_r)
+            gainratio = (S - new_S) / predictedreduction
+
+            result.log("\t mu=" + str(mu) + ": f=" + str(new_S) + ", gainratio=" + str(gainratio))
+            if gainratio > 0:
+                return guess + delta, mu / 3, False
+            mu *= 2
+
+        return None, mu, False
+
+    def computeStatistics(self, R1, unweighted_V, variance, result):
+        """Computes the statistics of the current iteration from the QR decomposition of the jacobi matrix
+        and adds them to the result: sigma, hessian, covariance, correlation and standard errors.
+
+        :param R1: the triangular factor of the (weighted) jacobi matrix
+        :type R1: numpy array
+        :param unweighted_V: the unweighted jacobi matrix if weights are used, None otherwise
+        :type unweighted_V: numpy array
+        :param variance: the variance estimate
+        :type variance: float
+        :param result: the result object to add the metrics to
+        :type result: Result
+        """
+        # without weights V^T V = R1^T R1, which is only a pxp product
+        if unweighted_V is not None:
+            sigma = unweighted_V.transpose().dot(unweighted_V)
+        else:
+            sigma = R1.transpose().dot(R1)
+
+        # approximation of the hessian (X^T * X)^-1 = (R1^T * R1)^-1 = R1^-1 * R1^-T
+        R1inv = solve_triangular(R1, np.eye(R1.shape[0]), lower=False, check_finite=False)
+        hessian = R1inv.dot(R1inv.transpose())
+        covariance_matrix = variance * hessian
+
+        result.addMetric("sigma", sigma)
+        result.addMetric("covariance", covariance_matrix)
+        result.addMetric("hessian", hessian)
+        newtonOptimizer_logger.info(f"covariance matrix: {covariance_matrix}")
+        newtonOptimizer_logger.info(f"hessian: {hessian}")
+
+        # construct correlation matrix (see p. 22 of Bates/Watts)
+        # L = D^-1 R1^-1, scaling the rows instead of building the diagonal matrix D^-1
+        L = R1inv / np.sqrt(np.diag(hessian))[:, None]
+        C = np.matmul(L, np.transpose(L))
+        result.addMetric("correlation", C)
+        newtonOptimizer_logger.info(f"correlation matrix: {C}")
+
+        # calculate standard error for the parameters (p.21)
+        s = np.sqrt(variance)
+        errors = s * np.sqrt(np.einsum("ij,ij->i", R1inv, R1inv))
+        result.addMetric("errors", errors)
+        newtonOptimizer_logger.info(f"errors: {errors}")
 
     def run(self, evaluator, initial_parameters, target, result=Result()):
 
@@ -23,6 +174,7 @@ class GaussNewtonOptimizer(Optimizer):
         result.addRunMetadata("linesearchmethod", type(self.linesearchmethod).__name__)
         result.addRunMetadata("epsilon", self.finite_differencing_epsilon)
         result.addRunMetadata("differencing", self.differencing.value)
+        result.addRunMetadata("damping", self.damping)
         result.addRunMetadata("fixedparameters", evaluator.fixedparameters)
         result.addRunMetadata("parametermanager", evaluator.parametermanager)
 
@@ -31,23 +183,27 @@ class GaussNewtonOptimizer(Optimizer):
 
         targetdata = target.getNumpyArray()
 
+        # the sizes are the same in every iteration
+        n = len(targetdata)
+        p = len(guess)
+        dof = n - p
+
         # prepare weight vector in correct length if weight is given
+        weight_vector = None
         if len(evaluator.weight) > 0:
-            weight_vector = np.ones(len(target.times))
-            curr_weight_index = 0
-            weight_vector[0] = evaluator.weight[curr_weight_index]
-            try:
-                for i in range(1, len(target.times)):
-                    if target.times[i - 1] > target.times[i]:
-                        curr_weight_index += 1
-                    weight_vector[i] = evaluator.weight[curr_weight_index]
-            except IndexError as exc:
+            # every decrease of the time starts the next series, which gets the next weight
+            weight_index = np.cumsum(np.diff(target.times, prepend=target.times[0]) < 0)
+            if weight_index[-1] >= len(evaluator.weight):
                 result.log("Error: Not enough weights given.")
                 newtonOptimizer_logger.error("Error: Not enough weights given.")
-                raise IndexError from exc
+                raise IndexError
+            weight_vector = np.asarray(evaluator.weight, dtype=np.float64)[weight_index]
+            # column view to scale the rows of the jacobian with
+            weight_column = weight_vector[:, None]
 
         last_S = -1
         first_S = -1
+        mu = self.damping
 
         for i in range(self.maxiterations):
             newtonOptimizer_logger.debug(f"Starting iteration {i} with parameters {guess}")
@@ -65,20 +221,14 @@ class GaussNewtonOptimizer(Optimizer):
             old_V = V
             # check if weight was given and apply it
             if len(evaluator.weight) > 0:
-                old_V = V
-                V = np.zeros((len(old_V), len(old_V[0])))
-                for i, row in enumerate(old_V):
-                    new_Vi = np.zeros(len(row))
-                    for j, entry in enumerate(row):
-                        new_Vi[j] = weight_vector[i] * entry
-                    V[i] = new_Vi
+                # scales every row of the jacobian by its weight
+                V = old_V * weight_column
             measurement = measurement_evaluation.getNumpyArrayLike(target)
 
             r = measurement - targetdata
-            if len(evaluator.weight) > 0:
-                r = weight_vector * r
-
-            sigma = np.dot(np.transpose(old_V), old_V)
+            if weight_vector is not None:
+                # r is a new array, so it can be weighted in place
+                r *= weight_vector
 
             S = 0.5 * r.dot(r)
 
@@ -86,10 +236,6 @@ class GaussNewtonOptimizer(Optimizer):
             if first_S == -1:
                 first_S = S
 
-            n = len(targetdata)
-            p = len(guess)
-            dof = n - p
-
             # calculate s^2 = residual mean square / variance estimate (p.6 Bates/Watts)
             variance = None if dof == 0 else S / dof
 
@@ -100,57 +246,52 @@ class GaussNewtonOptimizer(Optimizer):
             result.addMetric("variance", variance)
             result.addMetric("measurement", measurement)
             result.addMetric("measurementEvaluation", measurement_evaluation)
-            result.addMetric("sigma", sigma)
 
             if last_S != -1:
                 result.addMetric("reduction", S / last_S)
 
             result.log("[" + str(i) + "]: x=" + str(guess) + ", residual norm S=" + str(S))
+            if mu is not None:
+                result.addMetric("damping", mu)
             newtonOptimizer_logger.info(f"guess: {guess}, residual norm S: {S}")
 
             # calculate Gauss-Newton step direction (p. 40)
-            Q1, R1 = np.linalg.qr(V, mode='reduced')
-            w = Q1.transpose().dot(r)
-            delta = -np.linalg.solve(R1, w)
+            w, R1 = self.decomposeQR(V, r)
+            delta = -solve_triangular(R1, w, lower=False, check_finite=False)
 
             result.log("stepdirection is " + str(delta))
             newtonOptimizer_logger.info(f"stepdirection: {delta}")
 
-            # approximation of the hessian (X^T * X)^-1 = (R1^T * R1)^-1
-            hessian = np.linalg.inv(np.matmul(np.transpose(R1), R1))
-            covariance_matrix = variance * hessian
-
-            result.addMetric("covariance", covariance_matrix)
-            result.addMetric("hessian", hessian)
-            newtonOptimizer_logger.info(f"covariance matrix: {covariance_matrix}")
-            newtonOptimizer_logger.info(f"hessian: {hessian}")
-
-            # construct correlation matrix (see p. 22 of Bates/Watts)
-            R1inv = np.linalg.inv(R1)
-            Dinv = np.diag(1 / np.sqrt(np.diag(hessian)))
-            L = np.matmul(Dinv, R1inv)
-            C = np.matmul(L, np.transpose(L))
-            result.addMetric("correlation", C)
-            newtonOptimizer_logger.info(f"correlation matrix: {C}")
-
-            # calculate standard error for the parameters (p.21)
-            s = np.sqrt(variance)
-            errors = s * np.linalg.norm(R1inv, axis=1)
-            result.addMetric("errors", errors)
-            newtonOptimizer_logger.info(f"errors: {errors}")
+            # the statistics are only needed for the final parameters, unless requested for every iteration
+            converged = S / first_S < self.minreduction
+            statistics = self.iterationstatistics or converged or i == self.maxiterations - 1
+            if statistics:
+                self.computeStatistics(R1, old_V if len(evaluator.weight) > 0 else None, variance, result)
 
             # cancel the optimization when the reduction of the norm of the residuals is below
             # the threshhold and the confidence of the calibrated parameters is sufficiently low
-            if S / first_S < self.minreduction:
+            if converged:
                 result.log("-- Newton method converged. --")
                 newtonOptimizer_logger.info("Newton method converged.")
                 result.commitIteration()
                 break
 
-            # do linesearch in the gauss-newton search direction
-            nextguess = self.linesearchmethod.doLineSearch(delta, guess, target, V, r, result)[0]
+            if mu is None:
+                # do linesearch in the gauss-newton search direction
+                nextguess = self.linesearchmethod.doLineSearch(delta, guess, target, V, r, result)[0]
+            else:
+                nextguess, mu, converged = self.doDampedStep(evaluator, guess, target, V, r, S, mu, weight_vector, result)
+                if converged:
+                    if not statistics:
+                        self.computeStatistics(R1, old_V if len(evaluator.weight) > 0 else None, variance, result)
+                    result.log("-- Newton method converged. --")
+                    newtonOptimizer_logger.info("Newton method converged.")
+                    result.commitIteration()
+                    break
 
             if nextguess is None:
+                if not statistics:
+                    self.computeStatistics(R1, old_V if len(evaluator.weight) > 0 else None, variance, result)
                 result.log("-- Newton method did not converge. --")
                 newtonOptimizer_logger.debug("No next guess found.")
                 newtonOptimizer_logger.error("Newton method did not converge.")
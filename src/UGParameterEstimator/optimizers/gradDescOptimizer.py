@@ -29,6 +29,11 @@ class GradientDescentOptimizer(Optimizer):
 
         targetdata = target.getNumpyArray()
 
+        # the sizes are the same in every iteration
+        n = len(targetdata)
+        p = len(guess)
+        dof = n-p
+
         last_S = -1
         first_S = -1
 
@@ -52,10 +57,6 @@ class GradientDescentOptimizer(Optimizer):
             if first_S == -1:
                 first_S = S
 
-            n = len(targetdata)
-            p = len(guess)
-            dof = n-p
-
             # calculate s^2 = residual mean square / variance estimate (p.6 Bates/Watts)
             variance = S/dof
 
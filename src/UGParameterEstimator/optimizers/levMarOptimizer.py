@@ -32,9 +32,7 @@ class LevMarOptimizer(Optimizer):
                 gStar[x] = g[x] / np.sqrt(A[x,x])
         
         M = AStar + lam*np.diag(np.ones(p))
-        Q,R = np.linalg.qr(M)
-        w = Q.transpose().dot(g)
-        deltaStar = -np.linalg.solve(R, w)
+        deltaStar = -self.solvePositiveDefinite(M, g)
         delta = np.copy(deltaStar)
 
         if scaling:
@@ -62,6 +60,11 @@ class LevMarOptimizer(Optimizer):
 
         targetdata = target.getNumpyArray()
 
+        # the sizes are the same in every iteration
+        n = len(targetdata)
+        p = len(guess)
+        dof = n-p
+
         first_S = -1
         lam = self.initial_lam
 
@@ -85,10 +88,6 @@ class LevMarOptimizer(Optimizer):
             if first_S == -1:
                 first_S = S
 
-            n = len(targetdata)
-            p = len(guess)
-            dof = n-p
-
             # calculate s^2 = residual mean square / variance estimate (p.6 Bates/Watts)
 
             variance = None if dof == 0 else S/dof
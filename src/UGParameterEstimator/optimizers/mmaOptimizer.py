@@ -29,7 +29,6 @@ class MMAOptimizer(Optimizer):
         first_S = -1
 
         x = initial_parameters
-        n = len(x)
 
         U = x + (self.maximum - self.minimum)
         L = x - (self.maximum - self.minimum)
@@ -69,36 +68,28 @@ class MMAOptimizer(Optimizer):
 
             result.log("\t [" + str(iteration) + "]: Residual norm S=" + str(S))
 
-            p = np.zeros_like(x)
-            q = np.zeros_like(x)
+            # all parameters at once: p collects the positive, q the negative parts of the gradient
+            p = np.where(grad > 0, np.square(U - x) * grad, 0.0)
+            q = np.where(grad < 0, -np.square(x - L) * grad, 0.0)
             r = residual
-            next_x = np.zeros_like(x)
-            alpha = np.zeros_like(x)
-            beta = np.zeros_like(x)
-
-            l_deriv = lambda arg,j: (p[j] / np.square(U[j]-arg))-(q[j]/np.square(arg-L[j]))
-
-            for i in range(n):
-                if grad[i] > 0:
-                    p[i] = np.square(U[i] - x[i]) * grad[i]
-                elif grad[i] < 0:
-                    q[i] = - np.square(x[i]-L[i]) * grad[i] 
-
-                r -= p[i] / (U[i]-x[i])
-                r -= q[i] / (x[i]-L[i])
-
-                alpha[i] = max(self.minimum[i], 0.9*L[i]+0.1*x[i])
-                beta[i] = min(self.maximum[i], 0.9*U[i]+0.1*x[i])
-
-                if l_deriv(alpha[i],i) >= 0:
-                    next_x[i] = alpha[i]
-                elif l_deriv(beta[i], i) <= 0:
-                    next_x[i] = beta[i]
-                elif l_deriv(alpha[i],i) < 0 and l_deriv(beta[i],i) > 0:
-                    next_x[i] = (np.sqrt(p[i])*L[i]+np.sqrt(q[i])*U[i])/(np.square(p[i])+np.square(q[i]))
-                else:
-                    next_x[i] = x[i]
-                    print("l_deriv strange")
+            r -= np.sum(p / (U - x)) + np.sum(q / (x - L))
+
+            alpha = np.maximum(self.minimum, 0.9*L + 0.1*x)
+            beta = np.minimum(self.maximum, 0.9*U + 0.1*x)
+
+            l_deriv = lambda arg: (p / np.square(U - arg)) - (q / np.square(arg - L))
+            l_alpha = l_deriv(alpha)
+            l_beta = l_deriv(beta)
+
+            # the stationary point is only used where it lies between alpha and beta,
+            # so the warnings of the other entries can be ignored
+            with np.errstate(divide="ignore", invalid="ignore"):
+                stationary = (np.sqrt(p)*L + np.sqrt(q)*U) / (np.square(p) + np.square(q))
+
+            inbetween = (l_alpha < 0) & (l_beta > 0)
+            next_x = np.select([l_alpha >= 0, l_beta <= 0, inbetween], [alpha, beta, stationary], default=x)
+            if not np.all((l_alpha >= 0) | (l_beta <= 0) | inbetween):
+                print("l_deriv strange")
 
             if(S/first_S < self.minreduction):
                 result.log("-- MMA converged. --")
@@ -4,8 +4,9 @@ import subprocess
 import os
 import time
 import numpy as np
+import scipy.linalg
 from enum import Enum
-from UGParameterEstimator import Result, LineSearch, Evaluator, ParameterManager, ErroredEvaluation
+from UGParameterEstimator import Result, LineSearch, Evaluator, ParameterManager, Evaluation, ErroredEvaluation
 from abc import ABC, abstractmethod
 
 
@@ -15,6 +16,9 @@ class Optimizer(ABC):
 
     Differencing = Enum("Differencing", "central forward pure_forward pure_central")
 
+    # number of threads converting evaluations to numpy arrays, see Evaluation.getNumpyArraysLike
+    conversionthreads = 1
+
     def __init__(self, epsilon, differencing: Differencing):
         """Class constructor. Should be called by all classes implementing an optimizer.
 
@@ -44,18 +48,12 @@ class Optimizer(ABC):
         :return: the results of the covnertions
         :rtype: list of numpy arrays
         """
-        results = []
-        for e in evaluations:
-            if e is None or isinstance(e, ErroredEvaluation):
-                results.append(None)
-            else:
-                results.append(e.getNumpyArrayLike(target))
-        return results
+        return Evaluation.getNumpyArraysLike(evaluations, target, self.conversionthreads)
 
     def getJacobiMatrix(self, point, evaluator, target, result):
         """Calculates the jacobi matrix in parallel using finite differencing.
-        To do so, a number of jobs equal to the number of parameters will
-        be passed to the given evaluator.
+        To do so, the point itself and one disturbed point per parameter (two with
+        central differencing) will be passed to the given evaluator as a single batch.
         As approximation the finite differencing with epsilon set via the
         class constructor will be used.
 
@@ -71,47 +69,36 @@ class Optimizer(ABC):
         :return: the jacobi matrix, and the evaluation at 'point'
         :rtype: tuple (numpy array, Evaluation)
         """
-        jacobi = []
-
-        neededevaluations = []
-        neededevaluations.append(point)
+        # one disturbed point per row, the parameter i is disturbed in the (first) row i
+        point = np.asarray(point, dtype=np.float64)
+        eps = self.finite_differencing_epsilon
+        diagonal = np.arange(len(point))
 
         if self.differencing == Optimizer.Differencing.forward:
-            for i in range(len(point)):
-                changed = np.copy(point)
-                if changed[i] == 0:
-                    changed[i] = self.finite_differencing_epsilon
-                else:
-                    changed[i] *= 1 + self.finite_differencing_epsilon
-                neededevaluations.append(changed)
+            disturbed = np.tile(point, (len(point), 1))
+            disturbed[diagonal, diagonal] = np.where(point == 0, eps, point * (1 + eps))
         elif self.differencing == Optimizer.Differencing.pure_forward:
-            for i in range(len(point)):
-                changed = np.copy(point)
-                changed[i] += self.finite_differencing_epsilon
-                neededevaluations.append(changed)
+            disturbed = np.tile(point, (len(point), 1))
+            disturbed[diagonal, diagonal] = point + eps
         elif self.differencing == Optimizer.Differencing.central:
-            for i, p in enumerate(point):
-                changedPos = np.copy(point)
-                changedNeg = np.copy(point)
-                if p == 0:
-                    changedPos[i] = self.finite_differencing_epsilon
-                    changedNeg[i] = -self.finite_differencing_epsilon
-                else:
-                    changedNeg[i] *= 1 - self.finite_differencing_epsilon
-                    changedPos[i] *= 1 + self.finite_differencing_epsilon
-                neededevaluations.append(changedPos)
-                neededevaluations.append(changedNeg)
+            # alternating positive and negative steps
+            disturbed = np.tile(point, (2 * len(point), 1))
+            disturbed[2 * diagonal, diagonal] = np.where(point == 0, eps, point * (1 + eps))
+            disturbed[2 * diagonal + 1, diagonal] = np.where(point == 0, -eps, point * (1 - eps))
         elif self.differencing == Optimizer.Differencing.pure_central:
-            for i in range(len(point)):
-                changedPos = np.copy(point)
-                changedNeg = np.copy(point)
-                changedNeg[i] -= self.finite_differencing_epsilon
-                changedPos[i] += self.finite_differencing_epsilon
-                neededevaluations.append(changedPos)
-                neededevaluations.append(changedNeg)
+            disturbed = np.tile(point, (2 * len(point), 1))
+            disturbed[2 * diagonal, diagonal] = point + eps
+            disturbed[2 * diagonal + 1, diagonal] = point - eps
+
+        neededevaluations = [point] + list(disturbed)
+
+        # the finite differencing steps are practically never in the cache of this run, so only the point
+        # itself is looked up. with a cache directory, the steps may have been evaluated in an earlier run
+        checkdisturbed = evaluator.cachedirectory is not None
 
         with evaluator:
-            evaluations = evaluator.evaluate(neededevaluations, True, "jacobi-matrix")
+            evaluations = evaluator.evaluate(neededevaluations, True, "jacobi-matrix",
+                                             check_cache=[True] + [checkdisturbed] * (len(neededevaluations) - 1))
 
         result.log("jacobi matrix calculated. evaluations:")
 
@@ -130,26 +117,40 @@ class Optimizer(ABC):
         results = self.measurementToNumpyArrayConverter(evaluations, target)  # len: c * n_v
         undisturbed = results[0]
 
-        # calculate the jacobi matrix
+        # calculate the jacobi matrix, one row per parameter, transposed at the end
         # point len: n_v
-        for i, p in enumerate(point):
-            if self.differencing == Optimizer.Differencing.forward:
-                if p == 0:
-                    column = (results[i + 1] - undisturbed) / (self.finite_differencing_epsilon)
-                else:
-                    column = (results[i + 1] - undisturbed) / (self.finite_differencing_epsilon * p)
-            elif self.differencing == Optimizer.Differencing.pure_forward:
-                column = (results[i + 1] - undisturbed) / (self.finite_differencing_epsilon)
-            elif self.differencing == Optimizer.Differencing.central:
-                if p == 0:
-                    column = (results[2 * i + 1] - results[2 * i + 2]) / (2 * self.finite_differencing_epsilon)
-                else:
-                    column = (results[2 * i + 1] - results[2 * i + 2]) / (2 * self.finite_differencing_epsilon * p)
-            elif self.differencing == Optimizer.Differencing.pure_central:
-                column = (results[2 * i + 1] - results[2 * i + 2]) / (2 * self.finite_differencing_epsilon)
-            jacobi.append(column)
-
-        return (np.array(jacobi).transpose(), evaluations[0])
+        if self.differencing in (Optimizer.Differencing.forward, Optimizer.Differencing.central):
+            stepsizes = np.where(point == 0, self.finite_differencing_epsilon, self.finite_differencing_epsilon * point)
+        else:
+            stepsizes = np.full(len(point), self.finite_differencing_epsilon)
+
+        disturbed = np.vstack(results[1:])
+        if self.differencing in (Optimizer.Differencing.forward, Optimizer.Differencing.pure_forward):
+            jacobi = (disturbed - undisturbed) / stepsizes[:, None]
+        else:
+            jacobi = (disturbed[0::2] - disturbed[1::2]) / (2 * stepsizes)[:, None]
+
+        return (jacobi.transpose(), evaluations[0])
+
+    @staticmethod
+    def solvePositiveDefinite(M, b):
+        """Solves M x = b for a symmetric positive definite matrix M, e.g. the damped normal
+        matrix V^T V + lambda*I, using a cholesky factorization.
+        If M is not numerically positive definite, a QR factorization is used instead.
+
+        :param M: symmetric positive definite matrix
+        :type M: numpy array, 2d
+        :param b: right hand side
+        :type b: numpy array
+        :return: the solution x
+        :rtype: numpy array
+        """
+        try:
+            factor = scipy.linalg.cho_factor(M, lower=True, check_finite=False)
+        except np.linalg.LinAlgError:
+            Q, R = np.linalg.qr(M)
+            return np.linalg.solve(R, Q.transpose().dot(b))
+        return scipy.linalg.cho_solve(factor, b, check_finite=False)
 
     @abstractmethod
     def run(self, evaluator, initial_parameters, target, result=Result()):
@@ -2,6 +2,7 @@ from .optimizer import Optimizer
 from UGParameterEstimator import ParameterManager, Result, ErroredEvaluation
 import numpy as np
 import scipy
+from scipy.linalg.blas import ddot, dgemv
 
 class ScipyNonlinearLeastSquaresOptimizer(Optimizer):
 
@@ -27,20 +28,9 @@ class ScipyNonlinearLeastSquaresOptimizer(Optimizer):
         targetdata = target.getNumpyArray()
 
 
-        # assemble bounds
-        bounds = ([],[])
-
-        for p in self.parametermanager.parameters:
-
-            if p.maximumValue is None:
-                bounds[1].append(np.inf)
-            else:
-                bounds[1].append(p.optimizationSpaceUpperBound/(1+self.finite_differencing_epsilon))
-            
-            if p.minimumValue is None:
-                bounds[0].append(-np.inf)
-            else:
-                bounds[0].append(p.optimizationSpaceLowerBound)
+        # assemble bounds. the upper bounds leave some space to do the finite differencing for the jacobi matrix
+        lower, upper = self.parametermanager.getOptimizationSpaceBounds()
+        bounds = (lower, upper/(1+self.finite_differencing_epsilon))
 
 
         # define the callbacks for scipy
@@ -77,13 +67,20 @@ class ScipyNonlinearLeastSquaresOptimizer(Optimizer):
 
 class ScipyMinimizeOptimizer(Optimizer):
 
+    # methods evaluating the cost function and its gradient always at the same points. For these,
+    # both are computed by one callback, the others evaluate the cost function alone in their linesearch
+    combinedMethods = ("L-BFGS-B", "TNC")
+
     # opt_method must be one of "L-BFGS-B", "SLSQP" or "TNC"
-    def __init__(self, parametermanager, opt_method="L-BFGS-B", epsilon=1e-4, callback_root=False, callback_scaling=1, differencing=Optimizer.Differencing.forward):
+    # jac_lag: number of gradients computed with the last jacobi matrix before it is computed again.
+    # every reuse saves all evaluations of the disturbed points, but the gradients get less exact
+    def __init__(self, parametermanager, opt_method="L-BFGS-B", epsilon=1e-4, callback_root=False, callback_scaling=1, differencing=Optimizer.Differencing.forward, jac_lag=0):
         super().__init__(epsilon, differencing)
         self.parametermanager = parametermanager
         self.opt_method = opt_method
         self.callback_root = callback_root
         self.callback_scaling = callback_scaling
+        self.jac_lag = jac_lag
 
     def run(self, evaluator, initial_parameters, target, result = Result()):
 
@@ -97,6 +94,7 @@ class ScipyMinimizeOptimizer(Optimizer):
         result.addRunMetadata("differencing", self.differencing.value)
         result.addRunMetadata("fixedparameters", evaluator.fixedparameters)
         result.addRunMetadata("parametermanager", self.parametermanager)
+        result.addRunMetadata("jac_lag", self.jac_lag)
 
         result.log("-- Starting scipy optimization. --")
 
@@ -105,40 +103,40 @@ class ScipyMinimizeOptimizer(Optimizer):
 
         iteration_count = [0]
         last_S = [-1]
+        last_V = [None]
+        lag_count = [0]
+        # residual of the last cost function evaluation, with the parameters it belongs to
+        last_residual = [None, None]
 
 
         # assemble bounds
-        upper = []
-        lower = []
-
-        for p in self.parametermanager.parameters:
-            
-            if p.maximumValue is None:
-                upper.append(np.inf)
-            else:
-                # this is needed to still have some space to do the finite differencing for the jacobi matrix
-                upper.append(p.optimizationSpaceUpperBound/(1+self.finite_differencing_epsilon))
-            
-            if p.minimumValue is None:
-                lower.append(-np.inf)
-            else:
-                lower.append(p.optimizationSpaceLowerBound)
+        lower, upper = self.parametermanager.getOptimizationSpaceBounds()
+        # this is needed to still have some space to do the finite differencing for the jacobi matrix
+        upper /= 1+self.finite_differencing_epsilon
 
         bounds = scipy.optimize.Bounds(lower, upper)
 
         # define the callbacks for scipy
-        def scipy_function(x):
-            result.log("\tEvaluating cost function at x=" + str(x))
-            evaluation = evaluator.evaluate([x], True, "function-evaluation")[0]
-            if isinstance(evaluation, ErroredEvaluation):
-                result.log("Got a ErroredEvaluation: " + evaluation.reason)
-                result.log(evaluator.getStatistics())
-                result.save()
-                exit()
+        def jacobi_matrix(x):
+            # reuse the last jacobi matrix, only evaluating x itself
+            if last_V[0] is not None and lag_count[0] < self.jac_lag:
+                lag_count[0] += 1
+                result.log("\tReusing the last jacobi matrix (" + str(lag_count[0]) + "/" + str(self.jac_lag) + ")")
+                evaluation = evaluator.evaluate([x], True, "function-evaluation")[0]
+                if isinstance(evaluation, ErroredEvaluation):
+                    return None
+                return last_V[0], evaluation
+
+            jacobi_result = self.getJacobiMatrix(x, evaluator, target, result)
+            if jacobi_result is not None:
+                last_V[0] = jacobi_result[0]
+                lag_count[0] = 0
+            return jacobi_result
 
+        def cost_function(x, evaluation):
             measurement = evaluation.getNumpyArrayLike(target)
             r = measurement-targetdata
-            S = 0.5*r.dot(r)
+            S = 0.5*ddot(r, r)
 
             result.log("\t cost function is " + str(S))
             
@@ -152,17 +150,30 @@ class ScipyMinimizeOptimizer(Optimizer):
                 result.addMetric("reduction", S/last_S[0])
 
             last_S[0] = S
+            last_residual[0] = np.array(x, dtype=np.float64)
+            last_residual[1] = r
 
             # https://stackoverflow.com/a/47443343
 
             if self.callback_root:
-                return self.callback_scaling*np.sqrt(S)
+                return self.callback_scaling*np.sqrt(S), r
             else:
-                return self.callback_scaling*S
+                return self.callback_scaling*S, r
+
+        def scipy_function(x):
+            result.log("\tEvaluating cost function at x=" + str(x))
+            evaluation = evaluator.evaluate([x], True, "function-evaluation")[0]
+            if isinstance(evaluation, ErroredEvaluation):
+                result.log("Got a ErroredEvaluation: " + evaluation.reason)
+                result.log(evaluator.getStatistics())
+                result.save()
+                exit()
+
+            return cost_function(x, evaluation)[0]
 
         def scipy_jacobi(x):
             result.log("\tEvaluating jacobi matrix at at x=" + str(x))
-            jacobi_result = self.getJacobiMatrix(x, evaluator, target, result)
+            jacobi_result = jacobi_matrix(x)
             if jacobi_result is None:
                 result.log("Error calculating Jacobi matrix, UG run did not finish")
                 result.log(evaluator.getStatistics())
@@ -171,12 +182,32 @@ class ScipyMinimizeOptimizer(Optimizer):
 
             V, measurementEvaluation = jacobi_result
             result.addMetric("jacobian", V)
-            V = V.transpose()
-            measurement = measurementEvaluation.getNumpyArrayLike(target)
-            r = (measurement-targetdata)
-            grad = V.dot(r)
+            # scipy evaluates the cost function at x first, so its residual is reused
+            if last_residual[0] is not None and np.array_equal(last_residual[0], x):
+                r = last_residual[1]
+            else:
+                measurement = measurementEvaluation.getNumpyArrayLike(target)
+                r = (measurement-targetdata)
+            # V^T r, the jacobi matrix is stored column major, so BLAS uses it without a copy
+            grad = dgemv(1.0, V, r, trans=1)
             return grad
 
+        def scipy_function_and_jacobi(x):
+            # the jacobi matrix includes the evaluation at x, so the cost function and the
+            # disturbed points are evaluated in one batch instead of one after the other
+            result.log("\tEvaluating cost function and jacobi matrix at x=" + str(x))
+            jacobi_result = jacobi_matrix(x)
+            if jacobi_result is None:
+                result.log("Error calculating Jacobi matrix, UG run did not finish")
+                result.log(evaluator.getStatistics())
+                result.save()
+                exit()
+
+            V, measurementEvaluation = jacobi_result
+            result.addMetric("jacobian", V)
+            cost, r = cost_function(x, measurementEvaluation)
+            return cost, dgemv(1.0, V, r, trans=1)
+
         def scipy_callback(xk):
 
             iteration_count[0] += 1
@@ -186,8 +217,12 @@ class ScipyMinimizeOptimizer(Optimizer):
             result.commitIteration()
             return False
 
-        scipy_result = scipy.optimize.minimize( fun=scipy_function, x0=guess, jac=scipy_jacobi, 
-                                                bounds=bounds, callback=scipy_callback, method=self.opt_method)
+        if self.opt_method in self.combinedMethods:
+            scipy_result = scipy.optimize.minimize( fun=scipy_function_and_jacobi, x0=guess, jac=True,
+                                                    bounds=bounds, callback=scipy_callback, method=self.opt_method)
+        else:
+            scipy_result = scipy.optimize.minimize( fun=scipy_function, x0=guess, jac=scipy_jacobi, 
+                                                    bounds=bounds, callback=scipy_callback, method=self.opt_method)
 
         result.log("result is " + str(scipy_result))
 
@@ -1,6 +1,7 @@
 from .parameterOutputAdapter import ParameterOutputAdapter
 from .parameterManager import ParameterManager
 import json
+import math
 import os
 
 # Writes the Parameters to calibrate and all fixed parameters to a JSON file understandable by UG4
@@ -13,20 +14,58 @@ import os
 # ....
 class UG4ParameterOutputAdapter(ParameterOutputAdapter):
 
+    # the start of the entry of every parameter up to its value, together with the
+    # parametermanager and parameter count they were built for
+    _prefixcache = None
+
+    @staticmethod
+    def getEntryPrefix(name):
+        """Returns the start of the json entry of a parameter, up to its value.
+
+        :param name: name of the parameter
+        :type name: string
+        :return: start of the entry
+        :rtype: string
+        """
+        return json.dumps(name) + ': {"type": "number", "value": '
+
+    @staticmethod
+    def formatValue(value):
+        """Formats a value the same way as json.dump does.
+
+        :param value: value to format
+        :type value: float, or any json serializable value
+        :return: json representation of the value
+        :rtype: string
+        """
+        # the parameters are floats (numpy floats derive from float), formatted like json does it
+        if isinstance(value, float) and math.isfinite(value):
+            return float.__repr__(value)
+        return json.dumps(value)
+
     def writeParameters(self, directory: str, evaluation_id: int, parametermanager: ParameterManager, parameter, fixedparameters):
         
         parameterfile = os.path.join(directory, str(evaluation_id) + "_parameters.json")
 
-        # construct array object
-        parameterlist = {}
+        cachekey = (parametermanager, len(parametermanager.parameters))
+        if self._prefixcache is None or self._prefixcache[0] != cachekey:
+            self._prefixcache = (cachekey, [self.getEntryPrefix(p.name) for p in parametermanager.parameters])
+        prefixes = self._prefixcache[1]
+
+        # construct the json object directly, in the same format as json.dump.
+        # a fixed parameter of the same name replaces the value of a parameter
+        entries = []
         for i in range(len(parameter)):
-            parameterlist[parametermanager.parameters[i].name] = { "type": "number", "value": parameter[i] }
-                            
+            name = parametermanager.parameters[i].name
+            value = fixedparameters[name] if name in fixedparameters else parameter[i]
+            entries.append(prefixes[i] + self.formatValue(value) + "}")
 
-        for k in fixedparameters:                        
-            parameterlist[k] = { "type": "number", "value": fixedparameters[k] }
+        names = set(p.name for p in parametermanager.parameters[:len(parameter)])
+        for k in fixedparameters:
+            if k not in names:
+                entries.append(self.getEntryPrefix(k) + self.formatValue(fixedparameters[k]) + "}")
 
         # write as json file
         # this will be parsed by UG4
         with open(parameterfile,"w") as f:
-            json.dump(parameterlist, f)
\ No newline at end of file
+            f.write("{" + ", ".join(entries) + "}")
@@ -11,12 +11,23 @@ import os
 #
 class KeyValueFileParameterOutputAdapter(ParameterOutputAdapter):
 
+    # the "name=" prefixes of the parameters, together with the parametermanager and parameter count they were built for
+    _prefixcache = None
+
     def writeParameters(self, directory: str, evaluation_id: int, parametermanager: ParameterManager, parametervalues, fixedparameters):
         
         parameterfile = os.path.join(directory, str(evaluation_id) + "_parameters.txt")
-        # write the parameter file parsed in lua
-        with open(parameterfile,"w") as f:
-            for i in range(len(parametervalues)):
-                f.write(parametermanager.parameters[i].name + "=" + str(parametervalues[i]) + "\n")
-            for k in fixedparameters:
-                f.write(k + "=" + str(fixedparameters[k]) + "\n")
\ No newline at end of file
+
+        cachekey = (parametermanager, len(parametermanager.parameters))
+        if self._prefixcache is None or self._prefixcache[0] != cachekey:
+            self._prefixcache = (cachekey, [p.name + "=" for p in parametermanager.parameters])
+        prefixes = self._prefixcache[1]
+
+        lines = [prefixes[i] + str(parametervalues[i]) + "\n" for i in range(len(parametervalues))]
+        lines += [k + "=" + str(fixedparameters[k]) + "\n" for k in fixedparameters]
+
+        # write the parameter file parsed in lua. it is written to a temporary file first and then
+        # moved, so a running evaluation never reads a partially written file
+        with open(parameterfile + ".tmp","w") as f:
+            f.write("".join(lines))
+        os.replace(parameterfile + ".tmp", parameterfile)
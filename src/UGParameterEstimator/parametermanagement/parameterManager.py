@@ -1,6 +1,7 @@
 
 import numpy as np
 from enum import Enum
+from collections import OrderedDict
 from abc import ABC, abstractmethod
 
 class Parameter:
@@ -116,11 +117,20 @@ class ParameterManager:
     class WrongMappingError(Exception):
         pass
 
+    # number of transformed parameter sets kept, as the same sets are often transformed again
+    transformCacheSize = 64
+    _transformcache = None
+
+    # bounds of the optimization space, computed once
+    _boundscache = None
+
     def __init__(self):
         self.parameters = []
 
     def addParameter(self, parameter):
         self.parameters.append(parameter)
+        self._transformcache = None
+        self._boundscache = None
 
     def getInitialArray(self):
         array = np.zeros(len(self.parameters))
@@ -132,6 +142,27 @@ class ParameterManager:
 
     def getTransformedParameters(self, beta):
 
+        if self._transformcache is None:
+            self._transformcache = OrderedDict()
+
+        key = np.asarray(beta, dtype=np.float64).tobytes()
+        if key in self._transformcache:
+            self._transformcache.move_to_end(key)
+            return list(self._transformcache[key])
+
+        returnvalue = self.transformParameters(beta)
+
+        # invalid parameters are not cached, so they are reported every time
+        if returnvalue is not None:
+            self._transformcache[key] = returnvalue
+            if len(self._transformcache) > self.transformCacheSize:
+                self._transformcache.popitem(last=False)
+            return list(returnvalue)
+
+        return None
+
+    def transformParameters(self, beta):
+
         returnvalue = []
 
         for i in range(len(self.parameters)):
@@ -144,6 +175,21 @@ class ParameterManager:
 
         return returnvalue
 
+    def getOptimizationSpaceBounds(self):
+        """Returns the bounds of all parameters in the optimization space.
+        Parameters without a minimum or maximum value are unbounded in that direction.
+
+        :return: lower and upper bounds, -inf and inf where not bounded
+        :rtype: tuple of numpy arrays
+        """
+        if self._boundscache is None:
+            lower = np.array([-np.inf if p.minimumValue is None else p.optimizationSpaceLowerBound
+                              for p in self.parameters], dtype=np.float64)
+            upper = np.array([np.inf if p.maximumValue is None else p.optimizationSpaceUpperBound
+                              for p in self.parameters], dtype=np.float64)
+            self._boundscache = (lower, upper)
+        return self._boundscache[0].copy(), self._boundscache[1].copy()
+
     def isValidOptimizationSpaceParameter(self, beta):
 
         for i in range(len(self.parameters)):
@@ -1,9 +1,53 @@
+import atexit
 import logging
-logging.basicConfig(
-    filename='parameterEstimator.log',
-    filemode='w', # overwrite log file
-    format='[%(asctime)s %(name)s] (%(levelname)s) %(message)s', # i.e. [2020-01-01 12:00:00 parameterEstimator] (DEBUG) Starting newton method.
-    datefmt='%Y-%m-%d %H:%M:%S',
-    level=logging.DEBUG,
-    )
+import logging.handlers
+import multiprocessing
+import queue
+
+def _createFileHandler(mode):
+    handler = logging.FileHandler('parameterEstimator.log', mode=mode)
+    handler.setFormatter(logging.Formatter(
+        fmt='[%(asctime)s %(name)s] (%(levelname)s) %(message)s', # i.e. [2020-01-01 12:00:00 parameterEstimator] (DEBUG) Starting newton method.
+        datefmt='%Y-%m-%d %H:%M:%S'))
+    return handler
+
+# same as logging.basicConfig, which does nothing if logging was already configured. the log file
+# is written by a background thread, so logging calls do not wait for the disk. the listener is
+# stopped at exit, which writes all remaining records.
+# worker processes started by spawning import this module again and must not overwrite the log file. they
+# are recognized by their name (parent_process is only set after the import) and set up by setupWorkerLogging
+_root = logging.getLogger()
+_queuehandler = None
+if not _root.handlers and multiprocessing.current_process().name == "MainProcess":
+    _queue = queue.SimpleQueue()
+    # overwrite log file, but append from then on, so records of worker processes are not overwritten
+    open('parameterEstimator.log', 'w').close()
+    _listener = logging.handlers.QueueListener(_queue, _createFileHandler('a'))
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    # the formatter is set on the file handler only, setting it on the queue handler would format every record twice
+    _queuehandler = logging.handlers.QueueHandler(_queue)
+    _root.addHandler(_queuehandler)
+    _root.setLevel(logging.DEBUG)
+
+# wether the log file is written by this module, to be passed to setupWorkerLogging
+logfileconfigured = _queuehandler is not None
+
 logger = logging.getLogger("parameterEstimator")
+
+def setupWorkerLogging(configured):
+    """Initializer for worker processes (e.g. of a ProcessPoolExecutor). The listener writing the log file
+    only runs in the main process, so the workers append to the log file directly instead.
+
+    :param configured: logfileconfigured of the main process
+    :type configured: boolean
+    """
+    if not configured:
+        return
+    root = logging.getLogger()
+    # forked workers inherit the queue handler, whose queue is not read by any listener
+    if _queuehandler is not None:
+        root.removeHandler(_queuehandler)
+    root.addHandler(_createFileHandler('a'))
+    root.setLevel(logging.DEBUG)